@@ -1,22 +1,42 @@
 # backend.py
 
 # --- IMPORTS ---
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import streamlit as st
-import google.generativeai as genai
 from PIL import Image
 import io
+import os
+import sys
 import json
-import re
+import hashlib
 from datetime import datetime, date, timedelta
 import calendar
-from typing import List, Dict, Any
-import google.auth
-from google.oauth2 import service_account
-import vertexai
-from vertexai.preview.vision_models import ImageGenerationModel
+import asyncio
+import threading
+from html import escape
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+from typing_extensions import TypedDict # typing.TypedDict is rejected by the SDK schema builder on Python < 3.12
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+try:
+    from streamlit.runtime.scriptrunner_utils.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
+except ImportError: # Streamlit < 1.38
+    from streamlit.runtime.scriptrunner.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
 
+import lazy_init # Thread-safe lazy SDK clients + startup-time breakdown
+import i18n # Precompiled, fallback-resolved UI string tables (+ lazy locales/*.json)
+import metrics # Opt-in timing histograms (Prometheus text / JSON export)
 import firebase_auth # Helper module for Firebase (email/password auth, db helpers)
-import base64
+import kit_cache # Disk-backed LRU/TTL cache for AI responses
+import llm_telemetry # Rolling per-call log of LLM latency, tokens, retries and cache hits
+import rate_limiter # Process-wide token buckets + retry/backoff for Gemini & Imagen
+import single_flight # Coalesces identical in-flight requests across sessions
+import image_store # Content-addressed on-disk store (+ thumbnails) for Imagen outputs
+import event_store # SQLite event catalog with date-range / craft-tag indexes
+import image_prep # EXIF-fix / downsize / re-encode uploads before image-to-kit analysis
+import static_assets # Background/logo served from ./static instead of inline base64
 
 # --- TRANSLATIONS & CONFIG ---
 translations = {
@@ -95,6 +115,14 @@ translations = {
         "landing_info": "You can change this path anytime from the sidebar.",
         "back_to_home": "Back to Home",
         "desc_heading": "Description (Optional)",
+        "regenerate_label": "Regenerate fresh content",
+        "regenerate_help": "Ignore the saved result for these exact inputs and ask the AI again.",
+        "show_more_events": "Show more events ({shown} of {total})",
+        "more_this_month_header": "Also this month",
+        "extra_languages_label": "Also create this kit in",
+        "extra_languages_help": "The story is written once and then adapted into each extra language, so extra languages are much cheaper than generating again.",
+        "kit_language_label": "Kit language",
+        "spinner_text_variants": "Adapting your kit into {langs}...",
         # Calendar Translations
         "events_header": "📅 Artisan Events & Notifications",
         "event_preferences_header": "Event Preferences",
@@ -206,6 +234,14 @@ translations = {
         "landing_info": "आप कभी भी साइडबार से इस पथ को बदल सकते हैं।",
         "back_to_home": "वापस होम पर जाएं",
         "desc_heading": "विवरण (वैकल्पिक)",
+        "regenerate_label": "नई सामग्री फिर से बनाएं",
+        "regenerate_help": "इन्हीं इनपुट के लिए सहेजे गए परिणाम को छोड़कर AI से फिर से बनवाएं।",
+        "show_more_events": "और कार्यक्रम दिखाएं ({total} में से {shown})",
+        "more_this_month_header": "इस महीने के अन्य कार्यक्रम",
+        "extra_languages_label": "यह किट इन भाषाओं में भी बनाएं",
+        "extra_languages_help": "कहानी एक बार लिखी जाती है और फिर हर अतिरिक्त भाषा में ढाली जाती है, इसलिए अतिरिक्त भाषाएं दोबारा बनाने से काफी सस्ती पड़ती हैं।",
+        "kit_language_label": "किट की भाषा",
+        "spinner_text_variants": "आपकी किट को {langs} में ढाला जा रहा है...",
         # Calendar Translations
         "events_header": "📅 कारीगर कार्यक्रम और सूचनाएं",
         "event_preferences_header": "कार्यक्रम प्राथमिकताएं",
@@ -271,48 +307,75 @@ ALL_REQUIRED_KEYS = [
     "starts_in_caption","started_ago_caption","ended_ago_caption","active_reminder_warning",
     "no_active_reminders","event_concluded","calendar_year_label","calendar_month_label",
     "field_label_title","field_label_materials","field_label_region","field_label_tone",
-    "event_done","event_ongoing"
+    "event_done","event_ongoing","regenerate_label","regenerate_help","show_more_events",
+    "more_this_month_header","extra_languages_label","extra_languages_help","kit_language_label","spinner_text_variants"
 ]
 
-# Fill any missing Hindi keys with English fallback (prevents raw key display)
-for k in ALL_REQUIRED_KEYS:
-    if k not in translations["Hindi"]:
-        translations["Hindi"][k] = translations["English"].get(k, k)
-
-# Ensure every required key exists in Hindi (and any future languages) by copying from English.
-for _k in ALL_REQUIRED_KEYS:
-    if _k not in translations["Hindi"] or not translations["Hindi"][_k]:
-        translations["Hindi"][_k] = translations["English"].get(_k, _k)
+# Compiled once: every language table holds every key, with missing/empty strings
+# already resolved to English. Other UI languages load from locales/<Language>.json.
+I18N = i18n.Catalog(translations, ALL_REQUIRED_KEYS)
 
 # --- CACHED HELPERS & DATA FUNCTIONS ---
 
-@st.cache_data
 def t(key: str, lang: str = "English") -> str:
     """
-    Unified translation lookup with robust fallback:
+    Translation lookup in the precompiled tables (see i18n.py):
     1. If key exists in target language and non-empty -> return it
     2. Else if exists in English -> return English
     3. Else return the raw key (should not happen if ALL_REQUIRED_KEYS maintained)
     """
-    lang_map = translations.get(lang, translations["English"])
-    val = lang_map.get(key)
-    if val:
-        return val
-    return translations["English"].get(key, key)
+    return I18N.t(key, lang)
+
+@st.cache_resource
+def get_static_assets():
+    """Build static image variants once per process; returns their app/static URLs."""
+    return static_assets.build_static_assets()
 
 @st.cache_data
-def get_image_as_base64(file):
-    with open(file, "rb") as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
+def get_background_css() -> str:
+    variants = get_static_assets()["background"]
+    return static_assets.background_css(variants) if variants else ""
+
+GEMINI_MODEL_NAME = 'models/gemini-2.5-flash'
+IMAGEN_MODEL_NAME = "imagegeneration@006"
+DEFAULT_TIMEOUT_SECONDS = 600 # per generator call, rate-limit retries included
 
 @st.cache_resource
 def get_gemini_model():
-    return genai.GenerativeModel('models/gemini-2.5-flash')
+    return _GENAI.get().GenerativeModel(GEMINI_MODEL_NAME)
 
 @st.cache_resource
 def get_imagen_model():
-    return ImageGenerationModel.from_pretrained("imagegeneration@006")
+    return _IMAGE_GENERATION_MODEL.get().from_pretrained(IMAGEN_MODEL_NAME)
+
+@st.cache_resource
+def get_response_cache():
+    """Process-wide disk cache shared by every session (see kit_cache.py)."""
+    return kit_cache.ResponseCache()
+
+@st.cache_resource
+def get_llm_telemetry() -> Optional[llm_telemetry.TelemetryStore]:
+    """Process-wide rolling log of generator calls (see llm_telemetry.py); None when disabled."""
+    try:
+        settings = dict(st.secrets.get("llm_telemetry", {}))
+    except FileNotFoundError:
+        settings = {}
+    if os.environ.get("LLM_TELEMETRY", "").lower() in ("0", "false", "no") or not settings.get("enabled", True):
+        return None
+    return llm_telemetry.TelemetryStore(
+        settings.get("path", llm_telemetry.DEFAULT_TELEMETRY_PATH),
+        max_rows=int(settings.get("max_rows", llm_telemetry.DEFAULT_MAX_ROWS)),
+        max_age_seconds=float(settings.get("max_age_days", 30)) * 24 * 3600,
+    )
+
+def _track(generator: str, language: Optional[str], model: str = GEMINI_MODEL_NAME) -> llm_telemetry.CallRecord:
+    """Telemetry record for one generator call (use as a context manager)."""
+    return llm_telemetry.CallRecord(generator, language, model, get_llm_telemetry())
+
+@st.cache_resource
+def get_image_store():
+    """Process-wide store for generated images (see image_store.py)."""
+    return image_store.ImageStore()
 
 @st.cache_data
 def load_dummy_events() -> List[Dict[str, Any]]:
@@ -460,15 +523,80 @@ def load_dummy_events() -> List[Dict[str, Any]]:
     ]
     return events
 
-def filter_events_by_crafts(events: List[Dict[str, Any]], crafts: List[str]) -> List[Dict[str, Any]]:
-    if not crafts: return events
-    out = []
+@st.cache_resource
+def get_event_store() -> event_store.EventStore:
+    """Process-wide SQLite event catalog, seeded with the sample events on first run."""
+    try:
+        path = st.secrets.get("event_db_path", event_store.DEFAULT_EVENT_DB)
+    except FileNotFoundError:
+        path = event_store.DEFAULT_EVENT_DB
+    store = event_store.EventStore(path)
+    if len(store) == 0:
+        store.upsert_many(load_dummy_events())
+    return store
+
+EVENTS_PAGE_SIZE = 10
+
+CALENDAR_WEEKDAYS = ["Mon","Tue","Wed","Thu","Fri","Sat","Sun"]
+
+def month_events(year: int, month: int, crafts: List[str], retention_cutoff: date) -> List[Dict[str, Any]]:
+    """Events shown on the month grid, ordered by (start_date, title); ended ones before the cutoff are dropped."""
+    first = date(year, month, 1)
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    return get_event_store().query(max(first, retention_cutoff), last, list(crafts))
+
+def _calendar_day_html(day: date, events: List[Dict[str, Any]], today: date) -> str:
+    classes = ["calendar-cell"]
+    if day == today: classes.append("is-today")
+    if day < today: classes.append("is-past")
+    bars = []
     for ev in events:
-        tags = [x.lower() for x in ev.get('craft_tags', [])]
-        for c in crafts:
-            if c.lower() in tags or 'all' in tags:
-                out.append(ev); break
-    return out
+        bar_cls = ["event-bar"]
+        start_flag = day == ev['start_date']
+        end_flag = day == ev['end_date']
+        if not (start_flag and end_flag):
+            if start_flag:
+                bar_cls.append("event-bar-start")
+            elif end_flag:
+                bar_cls.append("event-bar-end")
+            else:
+                bar_cls.append("event-bar-middle")
+        # Only the first day carries the title, linking to the detailed event section
+        title_html = f"<a href='#event-{escape(ev['id'])}'>{escape(ev['title'])}</a>" if start_flag else "&nbsp;"
+        bars.append(f"<div class='{' '.join(bar_cls)}'>{title_html}</div>")
+    return (f"<div class='{' '.join(classes)}'><div class='day-number'>{day.day}</div>"
+            f"<div class='events-container'>{''.join(bars)}</div></div>")
+
+@metrics.timed("artisan_backend_call_seconds", call="render_month_calendar")
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_month_calendar(year: int, month: int, crafts: tuple, events_version: int,
+                          today: date, retention_cutoff: date) -> str:
+    """Whole month grid (weekday header + day cells) as one HTML fragment.
+
+    Cached per (year, month, craft filter, event store version, today, cutoff),
+    so reruns and month flips back and forth only re-send one markdown element
+    instead of re-rendering 7 columns per week. Only the displayed month is read
+    from the store; events ending before retention_cutoff are dropped, matching
+    the events list below the calendar.
+    """
+    first = date(year, month, 1)
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    # One pass over the events fills per-day buckets; appending in store order
+    # keeps each day's bars ordered by (start_date, title)
+    by_day: Dict[date, List[Dict[str, Any]]] = {}
+    for ev in month_events(year, month, crafts, retention_cutoff):
+        day = max(ev['start_date'], first)
+        while day <= min(ev['end_date'], last):
+            by_day.setdefault(day, []).append(ev)
+            day += timedelta(days=1)
+    cells = [f"<div class='calendar-dow'>{d}</div>" for d in CALENDAR_WEEKDAYS]
+    for week in calendar.Calendar().monthdatescalendar(year, month):
+        for day in week:
+            if day.month != month:
+                cells.append("<div class='calendar-cell empty'></div>")
+                continue
+            cells.append(_calendar_day_html(day, by_day.get(day, []), today))
+    return f"<div class='calendar-grid'>{''.join(cells)}</div>"
 
 def upcoming_events(events: List[Dict[str, Any]], days_ahead: int = 14) -> List[Dict[str, Any]]:
     today = date(2025, 9, 12)
@@ -495,49 +623,204 @@ def clean_day_artifacts(text: str) -> str:
     return text
 
 # --- AI & AUTHENTICATION CONFIG ---
-try:
-    GEMINI_API_KEY = st.secrets["GEMINI_API_KEY"]
-    genai.configure(api_key=GEMINI_API_KEY)
+# Nothing is configured at import time: each SDK is imported and set up on first
+# use (see lazy_init.py), so sessions that never call Gemini, Imagen or Firebase
+# don't pay for them.
+def _configure_rate_limits():
+    # Optional per-model quota overrides, e.g. [rate_limits."gemini-2.5-flash"] rpm = 120
+    if 'rate_limits' in st.secrets:
+        rate_limiter.configure({k: dict(v) for k, v in st.secrets['rate_limits'].items()})
+
+def _init_genai():
+    import google.generativeai as genai
+    _RATE_LIMITS.get()
+    genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
+    return genai
 
-    _project_id = None
-    _credentials = None
+def _init_vertex():
+    import google.auth
+    from google.oauth2 import service_account
+    import vertexai
+    from vertexai.preview.vision_models import ImageGenerationModel
+    _RATE_LIMITS.get()
+
+    project_id = None
+    credentials = None
     if 'GCP_SERVICE_ACCOUNT_JSON' in st.secrets:
         info = json.loads(st.secrets['GCP_SERVICE_ACCOUNT_JSON'])
-        _credentials = service_account.Credentials.from_service_account_info(info)
-        _project_id = _credentials.project_id
+        credentials = service_account.Credentials.from_service_account_info(info)
+        project_id = credentials.project_id
     else:
-        _credentials, _project_id = google.auth.default()
+        credentials, project_id = google.auth.default()
 
-    if not _project_id:
-        st.error("GCP Project ID missing.")
-        st.stop()
+    if not project_id:
+        raise RuntimeError("GCP Project ID missing.")
 
-    vertexai.init(project=_project_id, credentials=_credentials, location="us-central1")
+    vertexai.init(project=project_id, credentials=credentials, location="us-central1")
+    return ImageGenerationModel
 
-    # Firebase init (from helper)
+def _init_firebase():
     firebase_app = firebase_auth.init_firebase()
-    auth_handler = firebase_app.auth()
-    db_handler = firebase_app.database()
+    return firebase_app.auth(), firebase_app.database()
 
-except Exception as e:
-    st.error(f"Authentication or Configuration Error: {e}")
-    st.stop()
+def _init_metrics():
+    # Off unless METRICS_ENABLED=1 or [metrics] enabled = true; env vars take precedence
+    try:
+        settings = dict(st.secrets.get("metrics", {}))
+    except FileNotFoundError:
+        settings = {}
+    env = os.environ.get("METRICS_ENABLED")
+    if not (env.lower() in ("1", "true", "yes") if env else settings.get("enabled", False)):
+        return False
+    metrics.configure(True)
+    metrics.describe("artisan_backend_call_seconds", "Wall time of backend calls made by the UI.")
+    metrics.describe("artisan_frontend_section_seconds", "Wall time of each frontend.py section per rerun.")
+    metrics.describe("artisan_frontend_rerun_seconds", "Wall time of a full frontend.py rerun.")
+    port = os.environ.get("METRICS_PORT") or settings.get("port")
+    if port:
+        try:
+            metrics.start_http_server(int(port), settings.get("addr", "127.0.0.1"))
+        except OSError as e:
+            # Another worker already serves the port; keep recording regardless
+            print(f"[metrics] not serving on port {port}: {e}", file=sys.stderr)
+    json_path = os.environ.get("METRICS_JSON_PATH") or settings.get("json_path")
+    if json_path:
+        interval = float(os.environ.get("METRICS_DUMP_INTERVAL") or settings.get("dump_interval_seconds", 60))
+        metrics.start_json_dump(json_path, interval)
+    return True
 
-# --- AI HELPER FUNCTIONS ---
-def generate_image_with_imagen(prompt: str):
+_RATE_LIMITS = lazy_init.Lazy("rate limits", _configure_rate_limits)
+_GENAI = lazy_init.Lazy("gemini sdk", _init_genai)
+_IMAGE_GENERATION_MODEL = lazy_init.Lazy("vertex ai sdk", _init_vertex)
+_FIREBASE = lazy_init.Lazy("firebase", _init_firebase)
+_METRICS = lazy_init.Lazy("metrics", _init_metrics)
+
+def start_metrics() -> bool:
+    """Enable metrics export once per process if configured; True when recording."""
+    return _METRICS.get()
+
+def get_auth_handler():
+    """Pyrebase auth client (created on first use)."""
+    return _FIREBASE.get()[0]
+
+def get_db_handler():
+    """Pyrebase database client (created on first use)."""
+    return _FIREBASE.get()[1]
+
+def require_firebase():
+    """(auth_handler, db_handler) for UI code; stops the run with an error if Firebase can't be set up."""
     try:
-        model = get_imagen_model()
-        resp = model.generate_images(prompt=prompt, number_of_images=1, aspect_ratio="1:1")
-        if resp.images:
-            return Image.open(io.BytesIO(resp.images[0]._image_bytes))
-        st.error("No image returned.")
+        return _FIREBASE.get()
     except Exception as e:
-        st.error(f"Imagen error: {e}")
-    return None
+        st.error(f"Authentication or Configuration Error: {e}")
+        st.stop()
+
+# --- AI HELPER FUNCTIONS ---
+# Identical concurrent requests (same model + normalized prompt) share one upstream call
+_SINGLE_FLIGHT = single_flight.SingleFlight()
 
-def get_ai_content(prompt_fields, caption_language):
+def _generate_text(contents, generation_config=None, call=None) -> str:
+    """One rate-limited Gemini call returning the response text (raises on failure).
+    Retries and token usage are reported to ``call`` (a CallRecord) if given."""
     model = get_gemini_model()
-    text_prompt = f"""
+    response = rate_limiter.call_with_retry(
+        GEMINI_MODEL_NAME, model.generate_content,
+        contents, generation_config=generation_config,
+        request_options={"timeout":DEFAULT_TIMEOUT_SECONDS},
+        on_retry=call.on_retry if call else None, deadline=DEFAULT_TIMEOUT_SECONDS
+    )
+    if call is not None:
+        call.record_response(response)
+    return response.text
+
+def _imagen_generate(prompt: str, call=None):
+    """Call Imagen once; returns a PIL image or None if no image came back."""
+    model = get_imagen_model()
+    resp = rate_limiter.call_with_retry(
+        IMAGEN_MODEL_NAME, model.generate_images,
+        prompt=prompt, number_of_images=1, aspect_ratio="1:1",
+        on_retry=call.on_retry if call else None, deadline=DEFAULT_TIMEOUT_SECONDS
+    )
+    if call is not None:
+        call.record_response(resp)
+    if resp.images:
+        return Image.open(io.BytesIO(resp.images[0]._image_bytes))
+    return None
+
+def _imagen_generate_to_store(prompt: str, key: str, call=None):
+    """Generate with Imagen and persist into the image store; returns the key or None."""
+    img = _imagen_generate(prompt, call)
+    if img is None:
+        return None
+    return get_image_store().put(key, img)
+
+@metrics.timed("artisan_backend_call_seconds", call="generate_image_ref")
+def generate_image_ref(prompt: str, regenerate: bool = False):
+    """Return the image-store key for this prompt, generating the image on a miss.
+
+    Sessions keep only this short key; display the precomputed thumbnail via
+    image_thumbnail_path(key). ``regenerate=True`` replaces the stored image.
+    """
+    with _track("image", None, IMAGEN_MODEL_NAME) as call:
+        store = get_image_store()
+        key = store.key_for(IMAGEN_MODEL_NAME, prompt)
+        if not regenerate:
+            if store.has(key):
+                call.cache_hit()
+                return key
+            call.cache_miss()
+        try:
+            ref = _SINGLE_FLIGHT.do(key, _imagen_generate_to_store, prompt, key, call)
+            if ref is not None:
+                return ref
+            call.fail("no_image")
+            st.error("No image returned.")
+        except Exception as e:
+            call.fail(e)
+            st.error(f"Imagen error: {e}")
+        return None
+
+def image_thumbnail_path(key: str) -> Optional[str]:
+    """Thumbnail file for a stored image; None if it has since been evicted."""
+    path = get_image_store().thumbnail_path(key)
+    return path if os.path.exists(path) else None
+
+def image_path(key: str) -> str:
+    return get_image_store().path(key)
+
+@metrics.timed("artisan_backend_call_seconds", call="generate_image_with_imagen")
+def generate_image_with_imagen(prompt: str):
+    """Return the generated image as a PIL image (served from the image store when cached)."""
+    key = generate_image_ref(prompt)
+    return get_image_store().load(key) if key else None
+
+# --- Marketing kit result types (also used as Gemini's response schema) ---
+class InstagramPost(TypedDict):
+    caption: str
+    hashtags: str
+
+class TwitterPost(TypedDict):
+    text: str
+
+class FacebookPost(TypedDict):
+    caption: str
+    hashtags: str
+
+class MarketingKit(TypedDict):
+    story: str
+    instagram_post: InstagramPost
+    twitter_post: TwitterPost
+    facebook_post: FacebookPost
+
+# Structured-output mode: the model must return JSON matching MarketingKit.
+# A plain dict, so building it doesn't require importing the Gemini SDK.
+KIT_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": MarketingKit,
+}
+
+def _kit_prompt(prompt_fields, caption_language):
+    return f"""
 Generate a story and social media content for:
 Title: {prompt_fields.get('title','')}
 Materials: {prompt_fields.get('materials','')}
@@ -545,52 +828,190 @@ Region: {prompt_fields.get('region','')}
 Tone: {prompt_fields.get('tone','')}
 Description: {prompt_fields.get('description','')}
 
-All output must be valid JSON and in {caption_language}.
-Schema:
-{{
-"story":"...",
-"instagram_post":{{"caption":"...","hashtags":"..."}},
-"twitter_post":{{"text":"..."}},
-"facebook_post":{{"caption":"...","hashtags":"..."}}
-}}
+Write the story and all captions in {caption_language}.
 """
-    try:
-        r = model.generate_content(text_prompt, request_options={"timeout":600})
-        m = re.search(r'\{.*\}', r.text, re.DOTALL)
-        if m:
-            return json.loads(m.group(0))
-        st.error("No JSON found.")
-    except Exception as e:
-        st.error(f"Content generation error: {e}")
-    return None
 
-def get_ai_content_from_image(uploaded_image, caption_language, description):
-    model = genai.GenerativeModel('models/gemini-2.5-flash')
-    prompt = f"""
-Analyze the craft image and produce JSON marketing kit in {caption_language}.
+def _image_kit_prompt(caption_language, description):
+    return f"""
+Analyze the craft image and produce a story and social media marketing kit in {caption_language}.
 Description: {description}
-Schema:
-{{
-"story":"...",
-"instagram_post":{{"caption":"...","hashtags":"..."}},
-"twitter_post":{{"text":"..."}},
-"facebook_post":{{"caption":"...","hashtags":"..."}}
-}}
 """
+
+def _kit_from_data(data) -> Optional[MarketingKit]:
+    """A MarketingKit from decoded JSON; None unless the story and every post's
+    text are present and non-blank (hashtags may be empty)."""
+    if not isinstance(data, dict):
+        return None
+    def text(value):
+        return value if isinstance(value, str) else ""
+    def part(name, *required):
+        v = data.get(name)
+        if not isinstance(v, dict) or not all(text(v.get(k)).strip() for k in required):
+            return None
+        return v
+    story = text(data.get("story"))
+    ig, tw, fb = part("instagram_post", "caption"), part("twitter_post", "text"), part("facebook_post", "caption")
+    if not story.strip() or ig is None or tw is None or fb is None:
+        return None
+    return MarketingKit(
+        story=story,
+        instagram_post=InstagramPost(caption=text(ig.get("caption")), hashtags=text(ig.get("hashtags"))),
+        twitter_post=TwitterPost(text=text(tw.get("text"))),
+        facebook_post=FacebookPost(caption=text(fb.get("caption")), hashtags=text(fb.get("hashtags"))),
+    )
+
+def _parse_kit(text) -> Optional[MarketingKit]:
+    """Parse a schema-constrained kit response into a MarketingKit; None if invalid
+    (including a well-formed object with a missing or empty story or post)."""
     try:
-        img = Image.open(io.BytesIO(uploaded_image.getvalue()))
-        r = model.generate_content([prompt, img], request_options={"timeout":600})
-        m = re.search(r'\{.*\}', r.text, re.DOTALL)
-        if m:
-            return json.loads(m.group(0))
-        st.error("No JSON found in response.")
-    except Exception as e:
-        st.error(f"Image content error: {e}")
-    return None
+        data = json.loads(text)
+    except (TypeError, json.JSONDecodeError):
+        return None
+    return _kit_from_data(data)
 
-def get_market_trends(region, language, craft_type):
-    model = get_gemini_model()
-    prompt = f"""
+def _cached_kit(cache: kit_cache.ResponseCache, key: str) -> Optional[MarketingKit]:
+    """The cached kit for key, or None on a miss. Blank kits stored before
+    responses were validated count as misses and get regenerated."""
+    cached = cache.get(key)
+    return None if cached is None else _kit_from_data(cached)
+
+def _kit_cache_key(prompt_fields, caption_language):
+    return kit_cache.make_key(
+        "get_ai_content", GEMINI_MODEL_NAME,
+        kit_cache.normalize_prompt_fields(prompt_fields), caption_language
+    )
+
+@metrics.timed("artisan_backend_call_seconds", call="get_ai_content")
+def get_ai_content(prompt_fields, caption_language, regenerate: bool = False) -> Optional[MarketingKit]:
+    """Generate the marketing kit for the given prompt fields.
+
+    Results are cached on disk keyed by the normalized prompt fields, caption
+    language and model name. Pass ``regenerate=True`` to bypass the cached entry
+    and store a fresh generation in its place.
+    """
+    with _track("kit", caption_language) as call:
+        cache = get_response_cache()
+        cache_key = _kit_cache_key(prompt_fields, caption_language)
+        if not regenerate:
+            cached = _cached_kit(cache, cache_key)
+            if cached is not None:
+                call.cache_hit()
+                return cached
+            call.cache_miss()
+
+        prompt = _kit_prompt(prompt_fields, caption_language)
+        try:
+            text = _SINGLE_FLIGHT.do(
+                single_flight.make_key(GEMINI_MODEL_NAME, prompt), _generate_text, prompt, KIT_GENERATION_CONFIG, call
+            )
+            result = _parse_kit(text)
+            if result is not None:
+                cache.set(cache_key, result)
+                return result
+            call.fail("invalid_response")
+            st.error("The AI returned an invalid marketing kit.")
+        except Exception as e:
+            call.fail(e)
+            st.error(f"Content generation error: {e}")
+        return None
+
+@metrics.timed("artisan_backend_call_seconds", call="get_ai_content_from_image")
+def get_ai_content_from_image(uploaded_image, caption_language, description) -> Optional[MarketingKit]:
+    with _track("kit_from_image", caption_language) as call:
+        try:
+            data = uploaded_image.getvalue()
+            prompt = _image_kit_prompt(caption_language, description)
+            # Usually already prepared in the background since prefetch_upload() ran on upload
+            blob = image_prep.prepared_blob(data)
+            key = single_flight.make_key(GEMINI_MODEL_NAME, prompt, hashlib.sha256(data).hexdigest())
+            text = _SINGLE_FLIGHT.do(key, _generate_text, [prompt, blob], KIT_GENERATION_CONFIG, call)
+            result = _parse_kit(text)
+            if result is not None:
+                return result
+            call.fail("invalid_response")
+            st.error("The AI returned an invalid marketing kit.")
+        except Exception as e:
+            call.fail(e)
+            st.error(f"Image content error: {e}")
+        return None
+
+# --- Multi-language kits ---
+# Extra languages reuse the source kit: each variant is a short adaptation
+# call over the finished kit (a few hundred tokens in and out) rather than a
+# fresh generation. The story therefore stays the same across languages.
+
+def _localize_kit_prompt(kit: MarketingKit, source_language: str, target_language: str) -> str:
+    return f"""
+Here is a marketing kit (story and social media posts) written in {source_language}:
+{json.dumps(kit, ensure_ascii=False)}
+
+Rewrite the same kit in {target_language}. Keep the story's content, facts and structure, and adapt
+idioms, captions and hashtags so they read naturally to a {target_language} audience. Keep names of
+people, places and crafts. For Hinglish, write Hindi in Latin script mixed naturally with English.
+"""
+
+def _localized_kit_cache_key(kit: MarketingKit, source_language: str, target_language: str) -> str:
+    # Keyed on the source kit itself, so variants always match the story they came from
+    return kit_cache.make_key("localize_kit", GEMINI_MODEL_NAME, kit, source_language, target_language)
+
+@metrics.timed("artisan_backend_call_seconds", call="localize_kit")
+def localize_kit(kit: MarketingKit, source_language: str, target_language: str,
+                 regenerate: bool = False) -> Optional[MarketingKit]:
+    """Adapt an existing kit into another language (disk-cached like get_ai_content)."""
+    if target_language == source_language:
+        return kit
+    with _track("kit_localize", target_language) as call:
+        cache = get_response_cache()
+        cache_key = _localized_kit_cache_key(kit, source_language, target_language)
+        if not regenerate:
+            cached = _cached_kit(cache, cache_key)
+            if cached is not None:
+                call.cache_hit()
+                return cached
+            call.cache_miss()
+
+        prompt = _localize_kit_prompt(kit, source_language, target_language)
+        try:
+            text = _SINGLE_FLIGHT.do(
+                single_flight.make_key(GEMINI_MODEL_NAME, prompt), _generate_text, prompt, KIT_GENERATION_CONFIG, call
+            )
+            result = _parse_kit(text)
+            if result is not None:
+                cache.set(cache_key, result)
+                return result
+            call.fail("invalid_response")
+            st.error(f"The AI returned an invalid marketing kit ({target_language}).")
+        except Exception as e:
+            call.fail(e)
+            st.error(f"Content generation error ({target_language}): {e}")
+        return None
+
+def localize_kits(kit: MarketingKit, source_language: str, target_languages: List[str],
+                  regenerate: bool = False) -> Dict[str, Optional[MarketingKit]]:
+    """Adapt one kit into several languages in parallel; {language: kit or None}."""
+    futures = {
+        lang: _submit_with_script_ctx(localize_kit, kit, source_language, lang, regenerate=regenerate)
+        for lang in dict.fromkeys(target_languages) if lang != source_language
+    }
+    return {lang: future.result() for lang, future in futures.items()}
+
+@metrics.timed("artisan_backend_call_seconds", call="get_ai_content_multi")
+def get_ai_content_multi(prompt_fields, languages: List[str],
+                         regenerate: bool = False) -> Dict[str, Optional[MarketingKit]]:
+    """The kit in every language of ``languages``. The first language is generated
+    as usual; the others are adapted from it in parallel (see localize_kits)."""
+    primary = languages[0]
+    kit = get_ai_content(prompt_fields, primary, regenerate=regenerate)
+    if kit is None:
+        return {lang: None for lang in dict.fromkeys(languages)}
+    return {primary: kit, **localize_kits(kit, primary, languages[1:], regenerate=regenerate)}
+
+def prefetch_upload(uploaded_image):
+    """Start preprocessing an uploaded image in the background (see image_prep.py)."""
+    image_prep.prefetch(uploaded_image.getvalue())
+
+def _market_trends_prompt(region, language, craft_type):
+    return f"""
 Provide a detailed actionable market trend report (Markdown) in {language} for {craft_type} from {region}.
 Sections:
 - 📈 Trending Themes & Concepts
@@ -599,15 +1020,9 @@ Sections:
 - 💡 Actionable Pricing & Marketing Strategies
 Do not mention current date.
 """
-    try:
-        return model.generate_content(prompt, request_options={"timeout":600}).text
-    except Exception as e:
-        st.error(f"Trend gen error: {e}")
-        return None
 
-def get_growth_plan(region, language, platforms, craft_type, target_audience):
-    model = get_gemini_model()
-    prompt = f"""
+def _growth_plan_prompt(region, language, platforms, craft_type, target_audience):
+    return f"""
 Create a social media growth plan in {language} for {craft_type} from {region} targeting {target_audience}.
 For each platform ({', '.join(platforms)}):
 - Optimal Posting Times (IST)
@@ -617,11 +1032,311 @@ For each platform ({', '.join(platforms)}):
 End with encouragement.
 Markdown output only.
 """
+
+def _raw_text_stream(model, prompt, call=None):
+    """Yield Gemini text chunks; raises on failure (shared via single-flight)."""
+    # Retries cover opening the stream; a failure mid-stream is raised as-is
+    response = rate_limiter.call_with_retry(
+        GEMINI_MODEL_NAME, model.generate_content,
+        prompt, stream=True, request_options={"timeout":DEFAULT_TIMEOUT_SECONDS},
+        on_retry=call.on_retry if call else None, deadline=DEFAULT_TIMEOUT_SECONDS
+    )
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunk without text parts (e.g. safety/finish metadata only)
+            continue
+        if text:
+            yield text
+    if call is not None:
+        # usage_metadata is complete only once the stream has been consumed
+        call.record_response(response)
+
+def _stream_text(prompt, error_label, call=None):
+    """Yield text chunks from Gemini as they are produced (for st.write_stream).
+    Concurrent identical prompts read from one shared upstream stream."""
+    model = get_gemini_model()
     try:
-        return model.generate_content(prompt, request_options={"timeout":600}).text
+        yield from _SINGLE_FLIGHT.stream(
+            single_flight.make_key(GEMINI_MODEL_NAME, prompt), _raw_text_stream, model, prompt, call
+        )
     except Exception as e:
-        st.error(f"Growth plan error: {e}")
-        return None
+        if call is not None:
+            call.fail(e)
+        st.error(f"{error_label}: {e}")
+
+def _ui_translation_prompt(strings: Dict[str, str], language: str) -> str:
+    return f"""
+Translate the values of this JSON object from English into {language} for the user interface
+of an app that helps Indian artisans market their crafts.
+- Keep every key unchanged and return a JSON object with exactly the same keys.
+- Keep placeholders in curly braces (e.g. {{title}}, {{days}}) exactly as they are.
+- Keep emojis, Markdown, punctuation and brand names such as "Artisan AI Studio".
+- Use short, natural UI wording in the native script of {language}.
+
+{json.dumps(strings, ensure_ascii=False, indent=1)}
+"""
+
+def translate_ui_strings(strings: Dict[str, str], language: str) -> Dict[str, str]:
+    """Machine-translate UI strings {key: English text} into `language` in one
+    Gemini call. Used offline by build_locales.py (the app never translates at
+    runtime). Raises on failure; keys missing or empty in the reply are omitted."""
+    with _track("ui_translation", language) as call:
+        text = _generate_text(
+            _ui_translation_prompt(strings, language), {"response_mime_type": "application/json"}, call
+        )
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            call.fail("invalid_response")
+            raise ValueError("The AI returned an invalid translation table.")
+        return {k: v.strip() for k, v in data.items() if k in strings and isinstance(v, str) and v.strip()}
+
+def build_image_prompt(prompt_fields) -> str:
+    """Build the Imagen prompt from the kit's prompt fields (no AI output needed)."""
+    parts = []
+    for k in ['title','materials','region','tone','description']:
+        v = prompt_fields.get(k)
+        if v: parts.append(f"{k.capitalize()}: {v}")
+    return ", ".join(parts) or "Handcrafted Indian artisan item"
+
+# Shared pool for the work a session hands off (the Imagen half of a kit and
+# language fan-out); the story itself runs on the session's own script thread.
+# Workers may sleep in the rate limiter, so the pool is sized for many
+# concurrent sessions; threads are cheap since the calls are I/O bound.
+GENERATION_WORKERS = 32
+_GENERATION_POOL = ThreadPoolExecutor(max_workers=GENERATION_WORKERS, thread_name_prefix="kit-gen")
+
+def _submit_with_script_ctx(fn, *args, **kwargs):
+    """Submit fn to the generation pool, attaching the caller's Streamlit script
+    context so st.error/st.cache_* calls inside the worker behave as usual.
+    The worker's previous context is restored afterwards, so a pooled thread
+    never carries a finished session's context into the next task."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    def run():
+        thread = threading.current_thread()
+        previous = getattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+        if ctx is not None:
+            add_script_run_ctx(thread, ctx)
+        else:
+            setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, previous)
+    return _GENERATION_POOL.submit(run)
+
+@metrics.timed("artisan_backend_call_seconds", call="generate_kit_with_image")
+def generate_kit_with_image(prompt_fields, caption_language, regenerate: bool = False):
+    """Run story/caption generation and Imagen generation concurrently.
+
+    The image is generated on the shared pool while the story runs on the
+    calling script thread, so wall-clock time is that of the slower call and
+    each kit occupies one pool worker. Returns (ai_results, image_key) where
+    image_key refers to the image store; either may be None if that half
+    failed without affecting the other.
+    """
+    image_future = _submit_with_script_ctx(
+        generate_image_ref, build_image_prompt(prompt_fields), regenerate=regenerate
+    )
+    try:
+        ai_results = get_ai_content(prompt_fields, caption_language, regenerate=regenerate)
+    except Exception as e:
+        st.error(f"Content generation error: {e}")
+        ai_results = None
+    try:
+        image_key = image_future.result()
+    except Exception as e:
+        st.error(f"Imagen error: {e}")
+        image_key = None
+    return ai_results, image_key
+
+@metrics.timed("artisan_backend_call_seconds", call="generate_kit_with_image_multi")
+def generate_kit_with_image_multi(prompt_fields, languages: List[str], regenerate: bool = False):
+    """generate_kit_with_image for several caption languages at once.
+
+    The image is generated concurrently with the kit in ``languages[0]``. That
+    kit is then adapted into the remaining languages in parallel. Returns
+    ({language: kit or None}, image_key).
+    """
+    image_future = _submit_with_script_ctx(
+        generate_image_ref, build_image_prompt(prompt_fields), regenerate=regenerate
+    )
+    kits = get_ai_content_multi(prompt_fields, languages, regenerate=regenerate)
+    try:
+        image_key = image_future.result()
+    except Exception as e:
+        st.error(f"Imagen error: {e}")
+        image_key = None
+    return kits, image_key
+
+@metrics.timed("artisan_backend_call_seconds", call="get_market_trends")
+def get_market_trends(region, language, craft_type):
+    prompt = _market_trends_prompt(region, language, craft_type)
+    with _track("market_trends", language) as call:
+        try:
+            return _SINGLE_FLIGHT.do(
+                single_flight.make_key(GEMINI_MODEL_NAME, prompt), _generate_text, prompt, None, call
+            )
+        except Exception as e:
+            call.fail(e)
+            st.error(f"Trend gen error: {e}")
+            return None
+
+@metrics.timed("artisan_backend_call_seconds", call="stream_market_trends")
+def stream_market_trends(region, language, craft_type):
+    """Streaming variant of get_market_trends: yields Markdown chunks."""
+    with _track("market_trends", language) as call:
+        yield from _stream_text(_market_trends_prompt(region, language, craft_type), "Trend gen error", call)
+
+@metrics.timed("artisan_backend_call_seconds", call="get_growth_plan")
+def get_growth_plan(region, language, platforms, craft_type, target_audience):
+    prompt = _growth_plan_prompt(region, language, platforms, craft_type, target_audience)
+    with _track("growth_plan", language) as call:
+        try:
+            return _SINGLE_FLIGHT.do(
+                single_flight.make_key(GEMINI_MODEL_NAME, prompt), _generate_text, prompt, None, call
+            )
+        except Exception as e:
+            call.fail(e)
+            st.error(f"Growth plan error: {e}")
+            return None
+
+@metrics.timed("artisan_backend_call_seconds", call="stream_growth_plan")
+def stream_growth_plan(region, language, platforms, craft_type, target_audience):
+    """Streaming variant of get_growth_plan: yields Markdown chunks."""
+    with _track("growth_plan", language) as call:
+        yield from _stream_text(
+            _growth_plan_prompt(region, language, platforms, craft_type, target_audience),
+            "Growth plan error", call
+        )
+
+# --- ASYNC AI HELPERS ---
+# Asyncio-native counterparts of the generators above for batch/API callers that
+# compose many generations with asyncio.gather. Unlike the sync versions (which
+# report through st.error and return None), these raise: asyncio.TimeoutError
+# when ``deadline`` seconds pass, CancelledError when the task is cancelled, and
+# the SDK's own exception otherwise. Use gather(..., return_exceptions=True) to
+# collect partial results.
+
+async def _gemini_async(contents, deadline, key=None, generation_config=None, call=None):
+    """Rate-limited async Gemini call returning the response text. Concurrent
+    calls with the same key on this event loop share one request."""
+    model = get_gemini_model()
+
+    async def request():
+        r = await rate_limiter.call_with_retry_async(
+            GEMINI_MODEL_NAME, model.generate_content_async,
+            contents, generation_config=generation_config, request_options={"timeout": deadline},
+            on_retry=call.on_retry if call else None, deadline=deadline
+        )
+        if call is not None:
+            call.record_response(r)
+        return r.text
+
+    if key is None:
+        key = single_flight.make_key(GEMINI_MODEL_NAME, contents)
+    # The deadline bounds the whole call, including queueing and retries
+    return await asyncio.wait_for(_SINGLE_FLIGHT.do_async(key, request), timeout=deadline)
+
+@metrics.timed("artisan_backend_call_seconds", call="generate_image_ref_async")
+async def generate_image_ref_async(prompt: str, regenerate: bool = False,
+                                   deadline: float = DEFAULT_TIMEOUT_SECONDS):
+    """Async generate_image_ref. The Vertex vision SDK has no async client, so the
+    call runs in a worker thread; cancelling or timing out abandons its result."""
+    with _track("image", None, IMAGEN_MODEL_NAME) as call:
+        store = get_image_store()
+        key = store.key_for(IMAGEN_MODEL_NAME, prompt)
+        if not regenerate:
+            if store.has(key):
+                call.cache_hit()
+                return key
+            call.cache_miss()
+        ref = await asyncio.wait_for(
+            _SINGLE_FLIGHT.do_async(key, asyncio.to_thread, _imagen_generate_to_store, prompt, key, call),
+            timeout=deadline
+        )
+        if ref is None:
+            call.fail("no_image")
+            raise ValueError("No image returned.")
+        return ref
+
+@metrics.timed("artisan_backend_call_seconds", call="generate_image_with_imagen_async")
+async def generate_image_with_imagen_async(prompt: str, deadline: float = DEFAULT_TIMEOUT_SECONDS):
+    """Async generate_image_with_imagen returning a PIL image."""
+    key = await generate_image_ref_async(prompt, deadline=deadline)
+    return await asyncio.to_thread(get_image_store().load, key)
+
+@metrics.timed("artisan_backend_call_seconds", call="get_ai_content_async")
+async def get_ai_content_async(prompt_fields, caption_language, regenerate: bool = False,
+                               deadline: float = DEFAULT_TIMEOUT_SECONDS):
+    """Async get_ai_content; shares the same disk cache."""
+    with _track("kit", caption_language) as call:
+        cache = get_response_cache()
+        cache_key = _kit_cache_key(prompt_fields, caption_language)
+        if not regenerate:
+            cached = _cached_kit(cache, cache_key)
+            if cached is not None:
+                call.cache_hit()
+                return cached
+            call.cache_miss()
+        text = await _gemini_async(
+            _kit_prompt(prompt_fields, caption_language), deadline, generation_config=KIT_GENERATION_CONFIG,
+            call=call
+        )
+        result = _parse_kit(text)
+        if result is None:
+            call.fail("invalid_response")
+            raise ValueError("The AI returned an invalid marketing kit.")
+        cache.set(cache_key, result)
+        return result
+
+@metrics.timed("artisan_backend_call_seconds", call="get_ai_content_from_image_async")
+async def get_ai_content_from_image_async(uploaded_image, caption_language, description,
+                                          deadline: float = DEFAULT_TIMEOUT_SECONDS):
+    """Async get_ai_content_from_image (accepts an UploadedFile or raw bytes)."""
+    with _track("kit_from_image", caption_language) as call:
+        data = uploaded_image if isinstance(uploaded_image, bytes) else uploaded_image.getvalue()
+        prompt = _image_kit_prompt(caption_language, description)
+        blob = await asyncio.to_thread(image_prep.prepared_blob, data)
+        key = single_flight.make_key(GEMINI_MODEL_NAME, prompt, hashlib.sha256(data).hexdigest())
+        text = await _gemini_async(
+            [prompt, blob], deadline, key=key, generation_config=KIT_GENERATION_CONFIG, call=call
+        )
+        result = _parse_kit(text)
+        if result is None:
+            call.fail("invalid_response")
+            raise ValueError("The AI returned an invalid marketing kit.")
+        return result
+
+@metrics.timed("artisan_backend_call_seconds", call="get_market_trends_async")
+async def get_market_trends_async(region, language, craft_type, deadline: float = DEFAULT_TIMEOUT_SECONDS):
+    with _track("market_trends", language) as call:
+        return await _gemini_async(_market_trends_prompt(region, language, craft_type), deadline, call=call)
+
+@metrics.timed("artisan_backend_call_seconds", call="get_growth_plan_async")
+async def get_growth_plan_async(region, language, platforms, craft_type, target_audience,
+                                deadline: float = DEFAULT_TIMEOUT_SECONDS):
+    with _track("growth_plan", language) as call:
+        return await _gemini_async(
+            _growth_plan_prompt(region, language, platforms, craft_type, target_audience), deadline, call=call
+        )
+
+@metrics.timed("artisan_backend_call_seconds", call="generate_kit_with_image_async")
+async def generate_kit_with_image_async(prompt_fields, caption_language, regenerate: bool = False,
+                                        deadline: float = DEFAULT_TIMEOUT_SECONDS):
+    """Async counterpart of generate_kit_with_image. Returns (ai_results, image_key);
+    a half that fails or misses the deadline comes back as None."""
+    kit, image = await asyncio.gather(
+        get_ai_content_async(prompt_fields, caption_language, regenerate=regenerate, deadline=deadline),
+        generate_image_ref_async(build_image_prompt(prompt_fields), regenerate=regenerate, deadline=deadline),
+        return_exceptions=True
+    )
+    for part in (kit, image):
+        if isinstance(part, asyncio.CancelledError):
+            raise part
+    return (None if isinstance(kit, BaseException) else kit,
+            None if isinstance(image, BaseException) else image)
 
 # --- AUTH HELPER FUNCTIONS ---
 def parse_firebase_error(error_message):
@@ -649,4 +1364,6 @@ def parse_firebase_error(error_message):
     if "NETWORK" in msg or "TIMEOUT" in msg:
         return "Network issue. Please check your connection and try again."
 
-    return "An unexpected error occurred. Please try again later."
\ No newline at end of file
+    return "An unexpected error occurred. Please try again later."
+
+lazy_init.record("import backend", time.perf_counter() - _IMPORT_STARTED)
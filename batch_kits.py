@@ -0,0 +1,220 @@
+# batch_kits.py
+"""Bulk marketing-kit generation from a product catalog (CSV or JSONL).
+
+Each catalog row needs at least a ``title``; ``materials``, ``region``, ``tone``,
+``description`` and an optional ``language`` / ``sku`` (or ``id``) column are
+also read. Results are written incrementally to the output directory:
+
+    <out>/<row_id>.json   story + captions (plus the input fields)
+    <out>/<row_id>.png    generated image (unless --no-images)
+    <out>/progress.jsonl  one line per attempt, appended as rows finish
+
+Re-running with the same catalog and output directory resumes: rows whose
+outputs already exist are skipped, so only failed or unfinished rows are redone.
+Rows without a sku/id get an id derived from a hash of their fields, so
+editing the catalog between runs never maps outputs to the wrong row. Two
+different rows that end up with the same id are rejected; exact duplicate
+rows are processed once.
+
+Usage:
+    python batch_kits.py catalog.csv --out kits_out --workers 4 --image-concurrency 2
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+import backend
+
+CATALOG_FIELDS = ("title", "materials", "region", "tone", "description")
+
+
+def _content_id(row: Dict[str, Any]) -> str:
+    """Position-independent id for a row without sku/id: a hash of its fields."""
+    parts = [str(row.get(k) or "") for k in (*CATALOG_FIELDS, "language")]
+    return "row-" + hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+
+
+def read_catalog(path: str) -> List[Dict[str, Any]]:
+    """Read catalog rows from a .csv or .jsonl file and assign each a stable row id.
+
+    Raises ValueError if two different rows map to the same id (after
+    sanitising), since they would overwrite each other's outputs.
+    """
+    rows = []
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    rows.append(json.loads(line))
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            rows = list(csv.DictReader(f))
+
+    out = []
+    seen: Dict[str, tuple] = {} # row_id -> (line number, row)
+    collisions = []
+    for idx, row in enumerate(rows):
+        row = {k.strip().lower(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+        if not row.get("title"):
+            continue
+        raw_id = str(row.get("sku") or row.get("id") or _content_id(row))
+        row["row_id"] = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in raw_id)
+        if row["row_id"] in seen:
+            first_idx, first = seen[row["row_id"]]
+            if first == row:
+                print(f"skipping row {idx + 1}: duplicate of row {first_idx + 1}", file=sys.stderr)
+            else:
+                collisions.append(f"{row['row_id']!r} (rows {first_idx + 1} and {idx + 1})")
+            continue
+        seen[row["row_id"]] = (idx, row)
+        out.append(row)
+    if collisions:
+        raise ValueError("duplicate row ids: " + ", ".join(collisions))
+    return out
+
+
+class QuotaGate:
+    """Bounded concurrency per model plus a shared cool-down after failures.
+
+    When any call fails (typically a 429/quota error) every worker pauses
+    until the cool-down expires; the delay doubles on consecutive failures
+    and resets after a success.
+    """
+
+    def __init__(self, concurrency: int, base_delay: float = 2.0, max_delay: float = 60.0):
+        self._sem = threading.BoundedSemaphore(max(1, concurrency))
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+        self._delay = base_delay
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def call(self, fn, *args, **kwargs):
+        with self._sem:
+            wait = self._resume_at - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            result = fn(*args, **kwargs)
+        with self._lock:
+            if result is None:
+                self._resume_at = time.monotonic() + self._delay * (0.5 + random.random())
+                self._delay = min(self._delay * 2, self.max_delay)
+            else:
+                self._delay = self.base_delay
+        return result
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class BatchRunner:
+    def __init__(self, out_dir: str, default_language: str = "English", with_images: bool = True,
+                 workers: int = 4, text_concurrency: Optional[int] = None, image_concurrency: int = 2):
+        self.out_dir = out_dir
+        self.default_language = default_language
+        self.with_images = with_images
+        self.workers = max(1, workers)
+        self.text_gate = QuotaGate(text_concurrency or self.workers)
+        self.image_gate = QuotaGate(image_concurrency)
+        self._log_lock = threading.Lock()
+        os.makedirs(out_dir, exist_ok=True)
+
+    def _paths(self, row_id: str):
+        base = os.path.join(self.out_dir, row_id)
+        return f"{base}.json", f"{base}.png"
+
+    def is_done(self, row: Dict[str, Any]) -> bool:
+        json_path, png_path = self._paths(row["row_id"])
+        return os.path.exists(json_path) and (not self.with_images or os.path.exists(png_path))
+
+    def _log(self, entry: Dict[str, Any]) -> None:
+        entry["ts"] = time.time()
+        with self._log_lock:
+            with open(os.path.join(self.out_dir, "progress.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def process_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate whatever is still missing for one row and write it to disk."""
+        row_id = row["row_id"]
+        json_path, png_path = self._paths(row_id)
+        fields = {k: row.get(k, "") or "" for k in CATALOG_FIELDS}
+        language = row.get("language") or self.default_language
+        status = {"row_id": row_id, "text": "skipped", "image": "skipped"}
+
+        if not os.path.exists(json_path):
+            kit = self.text_gate.call(backend.get_ai_content, fields, language)
+            if kit is not None:
+                payload = {"row_id": row_id, "language": language, "fields": fields, "kit": kit}
+                _write_atomic(json_path, json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8"))
+            status["text"] = "ok" if kit is not None else "failed"
+
+        if self.with_images and not os.path.exists(png_path):
+            image_key = self.image_gate.call(backend.generate_image_ref, backend.build_image_prompt(fields))
+            if image_key is not None:
+                # Copy the stored PNG as-is (no decode/re-encode)
+                with open(backend.image_path(image_key), "rb") as f:
+                    _write_atomic(png_path, f.read())
+            status["image"] = "ok" if image_key is not None else "failed"
+
+        self._log(dict(status))
+        return status
+
+    def run(self, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+        pending = [r for r in rows if not self.is_done(r)]
+        summary = {"total": len(rows), "already_done": len(rows) - len(pending), "ok": 0, "failed": 0}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch-kit") as pool:
+            futures = {pool.submit(self.process_row, r): r["row_id"] for r in pending}
+            for future in as_completed(futures):
+                try:
+                    status = future.result()
+                    failed = "failed" in (status["text"], status["image"])
+                except Exception as e:
+                    self._log({"row_id": futures[future], "error": str(e)})
+                    failed = True
+                summary["failed" if failed else "ok"] += 1
+                print(f"[{summary['ok'] + summary['failed']}/{len(pending)}] {futures[future]}"
+                      f" {'FAILED' if failed else 'ok'}", flush=True)
+        return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate marketing kits for every row of a catalog file.")
+    parser.add_argument("catalog", help="CSV or JSONL file with title/materials/region/tone/description columns")
+    parser.add_argument("--out", default="kits_out", help="Output directory (reused to resume a batch)")
+    parser.add_argument("--language", default="English", help="Caption language when a row has no 'language' column")
+    parser.add_argument("--workers", type=int, default=4, help="Rows processed in parallel")
+    parser.add_argument("--text-concurrency", type=int, default=None, help="Max concurrent Gemini calls (default: workers)")
+    parser.add_argument("--image-concurrency", type=int, default=2, help="Max concurrent Imagen calls")
+    parser.add_argument("--no-images", action="store_true", help="Only generate story and captions")
+    args = parser.parse_args(argv)
+
+    try:
+        rows = read_catalog(args.catalog)
+    except ValueError as e:
+        parser.error(str(e))
+    runner = BatchRunner(
+        args.out, default_language=args.language, with_images=not args.no_images,
+        workers=args.workers, text_concurrency=args.text_concurrency,
+        image_concurrency=args.image_concurrency,
+    )
+    summary = runner.run(rows)
+    print(json.dumps(summary))
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
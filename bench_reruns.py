@@ -0,0 +1,387 @@
+# bench_reruns.py
+"""Benchmark the per-rerun cost of frontend.py, headlessly.
+
+Drives the app with Streamlit's AppTest against stubbed backends. Nothing
+leaves the process:
+- Gemini and Imagen are replaced by in-process stubs (no SDK import, no
+  credentials);
+- Firebase is the in-memory stand-in from firebase_local.py.
+
+Each scenario measures:
+- rerun wall time (min / median / mean / p95 / max, in ms);
+- forward messages and deltas sent to the browser per rerun, as count and
+  serialized bytes (counted at ForwardMsgQueue.enqueue);
+- peak Python heap allocation per rerun (tracemalloc). This is measured in a
+  separate pass so tracing does not inflate the timings.
+
+Scenarios:
+- "login": the login page;
+- "<workflow>": an idle rerun of a logged-in session in that workflow;
+- "<workflow>:action": a rerun that submits the workflow's main action.
+  Fresh inputs are used each time, so caches are missed.
+
+Results are printed (or written with --out) as one JSON document so they
+can be compared across releases.
+
+Usage:
+    python bench_reruns.py --iterations 20 --out bench.json
+    python bench_reruns.py --scenarios login events_calendar --llm-latency-ms 300
+"""
+
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from PIL import Image
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(BASE_DIR, "frontend.py")
+WORKFLOWS = ("generate_kit", "discover_trends", "growth_plan", "events_calendar")
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+
+STUB_KIT = {
+    "story": "A bench story about a handmade piece.",
+    "instagram_post": {"caption": "Handmade with love", "hashtags": "#handmade #bench"},
+    "twitter_post": {"text": "Handmade with love #bench"},
+    "facebook_post": {"caption": "Handmade with love", "hashtags": "#handmade"},
+}
+STUB_REPORT = "## Bench report\n\n" + "\n".join(f"- Point {i}: some *markdown* text." for i in range(20))
+
+
+# --- Stub AI backends -------------------------------------------------------
+
+class _StubUsage:
+    prompt_token_count = 0
+    candidates_token_count = 0
+    total_token_count = 0
+
+
+class _StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = _StubUsage()
+
+
+class _StubGenerativeModel:
+    latency = 0.0
+
+    def __init__(self, model_name: str, *args, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, contents, generation_config=None, stream=False, **kwargs):
+        time.sleep(self.latency)
+        text = json.dumps(STUB_KIT) if generation_config is not None else STUB_REPORT
+        if stream:
+            return [_StubResponse(text[i:i + 40]) for i in range(0, len(text), 40)]
+        return _StubResponse(text)
+
+    async def generate_content_async(self, contents, **kwargs):
+        return self.generate_content(contents, **kwargs)
+
+
+class _StubGenai:
+    """Module-like stand-in for google.generativeai (only what backend uses)."""
+    GenerativeModel = _StubGenerativeModel
+
+
+class _StubImage:
+    def __init__(self, data: bytes):
+        self._image_bytes = data
+
+
+class _StubImagenModel:
+    latency = 0.0
+    _png = None
+
+    @classmethod
+    def from_pretrained(cls, name: str) -> "_StubImagenModel":
+        return cls()
+
+    def generate_images(self, prompt: str, number_of_images: int = 1, **kwargs):
+        time.sleep(self.latency)
+        if _StubImagenModel._png is None:
+            buf = io.BytesIO()
+            Image.new("RGB", (1024, 1024), (196, 120, 60)).save(buf, format="PNG")
+            _StubImagenModel._png = buf.getvalue()
+
+        class _Response:
+            images = [_StubImage(_StubImagenModel._png)]
+        return _Response()
+
+
+def install_stubs(llm_latency_ms: float) -> None:
+    """Point backend's lazy SDK clients at the stubs (must run before the first AppTest run)."""
+    import backend
+    import lazy_init
+    import rate_limiter
+    _StubGenerativeModel.latency = _StubImagenModel.latency = llm_latency_ms / 1000.0
+    backend._GENAI = lazy_init.Lazy("gemini sdk (stub)", lambda: _StubGenai)
+    backend._IMAGE_GENERATION_MODEL = lazy_init.Lazy("vertex ai sdk (stub)", lambda: _StubImagenModel)
+    # Quotas would otherwise queue the stub calls and dominate the timings
+    rate_limiter.configure({name: {"rpm": 1e9, "burst": 1e9}
+                            for name in (backend.GEMINI_MODEL_NAME, backend.IMAGEN_MODEL_NAME)})
+
+
+# --- Message accounting -----------------------------------------------------
+
+class MessageCounter:
+    """Counts ForwardMsgs (and the deltas among them) as the script enqueues them."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.messages = self.message_bytes = self.deltas = self.delta_bytes = 0
+
+    def install(self) -> None:
+        from streamlit.runtime.forward_msg_queue import ForwardMsgQueue
+        original = ForwardMsgQueue.enqueue
+        counter = self
+
+        def enqueue(queue, msg):
+            size = msg.ByteSize()
+            counter.messages += 1
+            counter.message_bytes += size
+            if msg.WhichOneof("type") == "delta":
+                counter.deltas += 1
+                counter.delta_bytes += size
+            return original(queue, msg)
+
+        ForwardMsgQueue.enqueue = enqueue
+
+
+# --- Scenarios --------------------------------------------------------------
+
+def _new_app(secrets: Dict[str, Any]):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    for k, v in secrets.items():
+        at.secrets[k] = v
+    return at
+
+
+def _check(at, scenario: str) -> None:
+    if at.exception:
+        raise RuntimeError(f"{scenario}: app raised {at.exception[0].value}")
+
+
+def _logged_in_app(secrets: Dict[str, Any], workflow: str):
+    at = _new_app(secrets)
+    at.run()
+    at.text_input[0].input(BENCH_EMAIL)
+    at.text_input[1].input(BENCH_PASSWORD)
+    next(b for b in at.button if b.label == "Login").click().run()
+    if not at.session_state.logged_in:
+        raise RuntimeError(f"{workflow}: bench login failed: {[e.value for e in at.error]}")
+    at.session_state.selected_workflow_key = workflow
+    at.run()
+    return at
+
+
+def _by_label(widgets, label: str):
+    return next(w for w in widgets if w.label == label)
+
+
+def build_scenarios(secrets: Dict[str, Any]) -> Dict[str, Callable[[], Callable[[], Any]]]:
+    """name -> setup(); setup returns the step() to time (one rerun per call)."""
+    from backend import translations
+    en = translations["English"]
+    unique = itertools.count()
+
+    def login():
+        at = _new_app(secrets)
+        return at.run
+
+    def idle(workflow):
+        def setup():
+            return _logged_in_app(secrets, workflow).run
+        return setup
+
+    def generate_kit_action():
+        at = _logged_in_app(secrets, "generate_kit")
+
+        def step():
+            at.text_input(key="ai_title").input(f"Bench terracotta lamp {next(unique)}")
+            at.button(key="generate_with_ai_or_upload").click().run()
+        return step
+
+    def discover_trends_action():
+        at = _logged_in_app(secrets, "discover_trends")
+
+        def step():
+            at.text_input(key="trends_region").input("Jaipur")
+            _by_label(at.text_input, en["trends_label"]).input(f"Blue pottery {next(unique)}")
+            _by_label(at.button, en["trends_button"]).click().run()
+        return step
+
+    def growth_plan_action():
+        at = _logged_in_app(secrets, "growth_plan")
+
+        def step():
+            at.text_input(key="planner_region").input("Kutch")
+            _by_label(at.multiselect, en["planner_platform_label"]).set_value(["Instagram"])
+            _by_label(at.text_input, en["planner_craft_label"]).input(f"Bandhani {next(unique)}")
+            _by_label(at.button, en["planner_button"]).click().run()
+        return step
+
+    def events_calendar_action():
+        at = _logged_in_app(secrets, "events_calendar")
+        direction = itertools.cycle(["cal_next", "cal_prev"])
+
+        def step():
+            at.button(key=next(direction)).click().run()
+        return step
+
+    scenarios = {"login": login}
+    for wf in WORKFLOWS:
+        scenarios[wf] = idle(wf)
+    scenarios.update({
+        "generate_kit:action": generate_kit_action,
+        "discover_trends:action": discover_trends_action,
+        "growth_plan:action": growth_plan_action,
+        "events_calendar:action": events_calendar_action,
+    })
+    return scenarios
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "min": round(ordered[0], 3),
+        "median": round(statistics.median(ordered), 3),
+        "mean": round(statistics.fmean(ordered), 3),
+        "p95": round(ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))], 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def run_scenario(name: str, setup: Callable[[], Callable[[], Any]], counter: MessageCounter,
+                 iterations: int, warmup: int, memory_iterations: int) -> Dict[str, Any]:
+    step = setup()
+    for _ in range(warmup):
+        step()
+
+    times, messages, message_bytes, deltas, delta_bytes = [], [], [], [], []
+    for _ in range(iterations):
+        counter.reset()
+        started = time.perf_counter()
+        step()
+        times.append((time.perf_counter() - started) * 1000)
+        messages.append(counter.messages)
+        message_bytes.append(counter.message_bytes)
+        deltas.append(counter.deltas)
+        delta_bytes.append(counter.delta_bytes)
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(memory_iterations):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            step()
+            peaks.append((tracemalloc.get_traced_memory()[1] - base) / 1024)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "rerun_ms": _summary(times),
+        "forward_msgs": _summary(messages),
+        "forward_msg_bytes": _summary(message_bytes),
+        "deltas": _summary(deltas),
+        "delta_bytes": _summary(delta_bytes),
+        "peak_alloc_kib": _summary(peaks) if peaks else None,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark frontend.py reruns per workflow with stubbed backends.")
+    parser.add_argument("--iterations", type=int, default=10, help="Timed reruns per scenario")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed reruns before measuring")
+    parser.add_argument("--memory-iterations", type=int, default=3, help="Reruns traced with tracemalloc")
+    parser.add_argument("--scenarios", nargs="*", help="Subset of scenarios to run (default: all)")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Artificial latency of each stubbed Gemini/Imagen call")
+    parser.add_argument("--firebase-latency-ms", type=float, default=0.0, help="Artificial latency of each Firebase call")
+    parser.add_argument("--workdir", default=None, help="Directory for caches and the event store (default: fresh temp dir)")
+    parser.add_argument("--out", default=None, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    # Configure the stand-ins before backend / firebase_auth create anything
+    os.environ["FIREBASE_BACKEND"] = "memory"
+    os.environ["FIREBASE_LOCAL_LATENCY_MS"] = str(args.firebase_latency_ms)
+    out_path = os.path.abspath(args.out) if args.out else None
+    workdir = args.workdir or tempfile.mkdtemp(prefix="artisan-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir) # kit cache, image store and event store live under ./.cache
+    sys.path.insert(0, BASE_DIR)
+
+    import lazy_init
+    install_stubs(args.llm_latency_ms)
+    counter = MessageCounter()
+    counter.install()
+
+    secrets = {"GEMINI_API_KEY": "bench", "firebase_backend": "memory"}
+    scenarios = build_scenarios(secrets)
+    selected = args.scenarios or list(scenarios)
+    unknown = [s for s in selected if s not in scenarios]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)} (choose from {', '.join(scenarios)})")
+
+    # First run creates the (in-memory) Firebase app; register the bench user on it
+    first = _new_app(secrets)
+    first.run()
+    _check(first, "bootstrap")
+    import backend
+    backend.get_auth_handler().create_user_with_email_and_password(BENCH_EMAIL, BENCH_PASSWORD)
+
+    results = {}
+    for name in selected:
+        results[name] = run_scenario(name, scenarios[name], counter,
+                                     args.iterations, args.warmup, args.memory_iterations)
+        print(f"{name}: median {results[name]['rerun_ms']['median']} ms", file=sys.stderr)
+
+    import streamlit
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "streamlit": streamlit.__version__,
+            "platform": platform.platform(),
+            "llm_latency_ms": args.llm_latency_ms,
+            "firebase_latency_ms": args.firebase_latency_ms,
+            "startup_ms": lazy_init.report(),
+        },
+        "scenarios": results,
+    }
+    payload = json.dumps(report, indent=2)
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,196 @@
+# build_locales.py
+"""Offline machine translation of the UI string catalog into locales/<Language>.json.
+
+The English strings for every UI key (backend.translations plus
+ALL_REQUIRED_KEYS) are sent to Gemini in batches, one JSON object per call.
+The replies are written as the flat tables that i18n.py loads. The app only
+ever reads these precompiled files and never translates at runtime.
+
+Every accepted translation goes into a persistent per-key cache
+(`.cache/locale_cache.sqlite3`), keyed by language and UI key and tagged with
+a hash of the English source text. A rebuild therefore only sends strings
+that are new or whose English text changed. A reply that drops or alters a
+{placeholder} is rejected. Such keys, and keys from failed batches, are left
+out of the table, so the app shows English for them, and the next run
+retries them.
+
+Usage:
+    python build_locales.py                           # Bengali, Tamil, Gujarati, Marathi
+    python build_locales.py --languages Tamil Marathi --batch-size 40
+    python build_locales.py --dry-run                 # show what would be translated
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import string
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import backend
+import i18n
+
+# Matches the content languages offered by the growth-plan workflow
+DEFAULT_LANGUAGES = ("Bengali", "Tamil", "Gujarati", "Marathi")
+DEFAULT_CACHE_PATH = os.path.join(".cache", "locale_cache.sqlite3")
+DEFAULT_BATCH_SIZE = 50
+
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def placeholders(text: str) -> set:
+    """Names of the str.format fields in text (e.g. {"title", "days"})."""
+    try:
+        return {field for _, field, _, _ in string.Formatter().parse(text) if field is not None}
+    except ValueError:
+        return {"<malformed>"}
+
+
+def source_strings() -> Dict[str, str]:
+    """English text for every UI key, in catalog order."""
+    english = backend.translations[i18n.FALLBACK_LANGUAGE]
+    keys = dict.fromkeys([*english, *backend.ALL_REQUIRED_KEYS])
+    return {k: english[k] for k in keys if english.get(k)}
+
+
+class TranslationCache:
+    """Thread-safe SQLite map of (language, key) -> translation of a given source hash."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS translations (
+                language TEXT NOT NULL,
+                key TEXT NOT NULL,
+                source_hash TEXT NOT NULL,
+                text TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (language, key)
+            )"""
+        )
+        self._conn.commit()
+
+    def lookup(self, language: str) -> Dict[str, Tuple[str, str]]:
+        """key -> (source_hash, text) for every cached string of `language`."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, source_hash, text FROM translations WHERE language = ?", (language,)
+            ).fetchall()
+        return {key: (h, text) for key, h, text in rows}
+
+    def put_many(self, language: str, rows: Iterable[Tuple[str, str, str]]) -> None:
+        """Store (key, source_hash, text) rows, replacing older translations of those keys."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations (language, key, source_hash, text, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(language, key, h, text, now) for key, h, text in rows],
+            )
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _batches(items: Dict[str, str], size: int) -> List[Dict[str, str]]:
+    keys = list(items)
+    return [{k: items[k] for k in keys[i:i + size]} for i in range(0, len(keys), size)]
+
+
+def _translate_batch(language: str, batch: Dict[str, str]) -> Tuple[Dict[str, str], int, Optional[str]]:
+    """(accepted translations, rejected count, error) for one batch."""
+    try:
+        result = backend.translate_ui_strings(batch, language)
+    except Exception as e:
+        return {}, len(batch), f"{type(e).__name__}: {e}"
+    accepted = {k: v for k, v in result.items() if placeholders(v) == placeholders(batch[k])}
+    return accepted, len(batch) - len(accepted), None
+
+
+def build(languages: Iterable[str], out_dir: str = i18n.LOCALES_DIR, cache_path: str = DEFAULT_CACHE_PATH,
+          batch_size: int = DEFAULT_BATCH_SIZE, workers: int = 4, force: bool = False,
+          dry_run: bool = False) -> List[Dict[str, object]]:
+    """Translate what the cache lacks, then write one locales/<Language>.json per language."""
+    sources = source_strings()
+    hashes = {k: source_hash(v) for k, v in sources.items()}
+    cache = TranslationCache(cache_path)
+    tables: Dict[str, Dict[str, str]] = {}
+    stats: Dict[str, Dict[str, object]] = {}
+    jobs = []
+    for language in languages:
+        cached = {} if force else cache.lookup(language)
+        table = {k: cached[k][1] for k in sources if k in cached and cached[k][0] == hashes[k]}
+        todo = {k: v for k, v in sources.items() if k not in table}
+        tables[language] = table
+        stats[language] = {"language": language, "cached": len(table), "translated": 0,
+                           "rejected": 0, "errors": []}
+        if not dry_run:
+            jobs.extend((language, batch) for batch in _batches(todo, batch_size))
+        else:
+            stats[language]["pending"] = len(todo)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(_translate_batch, language, batch): language for language, batch in jobs}
+        for future in as_completed(futures):
+            language = futures[future]
+            accepted, rejected, error = future.result()
+            cache.put_many(language, [(k, hashes[k], v) for k, v in accepted.items()])
+            tables[language].update(accepted)
+            stats[language]["translated"] += len(accepted)
+            stats[language]["rejected"] += rejected
+            if error:
+                stats[language]["errors"].append(error)
+
+    if not dry_run:
+        os.makedirs(out_dir, exist_ok=True)
+        for language, table in tables.items():
+            ordered = {k: table[k] for k in sources if k in table}
+            payload = json.dumps(ordered, ensure_ascii=False, indent=2) + "\n"
+            _write_atomic(os.path.join(out_dir, f"{language}.json"), payload.encode("utf-8"))
+            stats[language]["missing"] = len(sources) - len(ordered)
+    return list(stats.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Machine-translate the UI strings into locales/<Language>.json.")
+    parser.add_argument("--languages", nargs="+", default=list(DEFAULT_LANGUAGES), help="Target UI languages")
+    parser.add_argument("--out", default=i18n.LOCALES_DIR, help="Directory for the <Language>.json tables")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Per-key translation cache (SQLite)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Strings per translation call")
+    parser.add_argument("--workers", type=int, default=4, help="Translation calls in parallel")
+    parser.add_argument("--force", action="store_true", help="Ignore the cache and re-translate everything")
+    parser.add_argument("--dry-run", action="store_true", help="Only report how many strings need translating")
+    args = parser.parse_args(argv)
+
+    bad = [lang for lang in args.languages if not lang or os.path.basename(lang) != lang or lang.startswith(".")]
+    if bad:
+        parser.error(f"invalid language name(s): {', '.join(map(repr, bad))}")
+    builtin = [lang for lang in args.languages if lang in backend.translations]
+    if builtin:
+        parser.error(f"{', '.join(builtin)} is maintained by hand in backend.py")
+    summary = build(args.languages, args.out, args.cache, args.batch_size, args.workers, args.force, args.dry_run)
+    for row in summary:
+        for error in row["errors"]:
+            print(f"[{row['language']}] {error}", file=sys.stderr)
+    print(json.dumps(summary, ensure_ascii=False))
+    return 0 if all(not row["errors"] and not row["rejected"] for row in summary) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
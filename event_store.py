@@ -0,0 +1,228 @@
+# event_store.py
+"""SQLite-backed event catalog.
+
+Events live in one local SQLite file instead of a hard-coded list copied into
+every session. The UI asks only for the window it shows: a calendar month,
+the reminder horizon, or one page of the events list. Per-session memory
+therefore no longer grows with the size of the catalog.
+
+Range queries are bounded on the start-date index. An event overlapping
+[a, b] must start in [a - max_span, b], where max_span is the longest span of
+any regular event (kept in the meta table). Events longer than LONG_SPAN_DAYS
+would widen that window for every query, so they are not counted in
+max_span. A small partial index serves them instead. A separate
+(lower-cased tag -> event) table serves craft filters, and events tagged
+"all" match every filter. Every write bumps a version counter; render caches
+use it in their keys.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_EVENT_DB = os.path.join(".cache", "events.sqlite3")
+LONG_SPAN_DAYS = 31
+
+_COLUMNS = ("id", "title", "start_date", "end_date", "venue", "city", "description")
+_FIELDS = "id, title, start_date, end_date, venue, city, description, craft_tags, extra"
+_SELECT = f"SELECT {_FIELDS} FROM events"
+
+
+def _row_to_event(row) -> Dict[str, Any]:
+    ev = json.loads(row[8]) if row[8] else {}
+    ev.update({
+        "id": row[0], "title": row[1],
+        "start_date": date.fromisoformat(row[2]), "end_date": date.fromisoformat(row[3]),
+        "venue": row[4], "city": row[5], "description": row[6],
+        "craft_tags": json.loads(row[7]),
+    })
+    return ev
+
+
+class EventStore:
+    """Thread-safe SQLite event catalog with date-range and craft-tag indexes."""
+
+    def __init__(self, path: str = DEFAULT_EVENT_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                start_date TEXT NOT NULL,
+                end_date TEXT NOT NULL,
+                venue TEXT,
+                city TEXT,
+                description TEXT,
+                craft_tags TEXT NOT NULL,
+                extra TEXT,
+                span_days INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_events_start ON events(start_date, title);
+            CREATE INDEX IF NOT EXISTS idx_events_end ON events(end_date);
+            CREATE TABLE IF NOT EXISTS event_tags (
+                tag TEXT NOT NULL,
+                event_id TEXT NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+                label TEXT NOT NULL,
+                PRIMARY KEY (tag, event_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_event_tags_event ON event_tags(event_id);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(events)")}
+        if "span_days" not in columns: # catalog written before spans were tracked
+            self._conn.execute("ALTER TABLE events ADD COLUMN span_days INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute(
+                "UPDATE events SET span_days = CAST(julianday(end_date) - julianday(start_date) AS INTEGER)"
+            )
+        self._conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) SELECT 'max_span', COALESCE(MAX(span_days), 0) "
+            f"FROM events WHERE span_days <= {LONG_SPAN_DAYS}"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_events_long ON events(end_date) WHERE span_days > {LONG_SPAN_DAYS}"
+        )
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.commit()
+
+    @property
+    def version(self) -> int:
+        """Write counter; changes whenever any event is added, replaced or removed."""
+        with self._lock:
+            return self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def _bump_version(self) -> None:
+        self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def _max_span(self) -> int:
+        return self._conn.execute("SELECT value FROM meta WHERE key = 'max_span'").fetchone()[0]
+
+    def upsert_many(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Insert or replace events (matched by id) in a single transaction."""
+        rows, tags = [], []
+        max_span = 0
+        for ev in events:
+            extra = {k: v for k, v in ev.items() if k not in _COLUMNS and k != "craft_tags"}
+            span = (ev["end_date"] - ev["start_date"]).days
+            if span <= LONG_SPAN_DAYS:
+                max_span = max(max_span, span)
+            rows.append((
+                ev["id"], ev["title"], ev["start_date"].isoformat(), ev["end_date"].isoformat(),
+                ev.get("venue"), ev.get("city"), ev.get("description"),
+                json.dumps(list(ev.get("craft_tags", [])), ensure_ascii=False),
+                json.dumps(extra, ensure_ascii=False, default=str) if extra else None,
+                span,
+            ))
+            tags.extend((label.lower(), ev["id"], label) for label in ev.get("craft_tags", []))
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM event_tags WHERE event_id = ?", [(r[0],) for r in rows]
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO events (id, title, start_date, end_date, venue, city, description, "
+                "craft_tags, extra, span_days) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            # Only ever grows: a window wider than needed is still correct, just slightly slower
+            self._conn.execute(
+                "UPDATE meta SET value = MAX(value, ?) WHERE key = 'max_span'", (max_span,)
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO event_tags (tag, event_id, label) VALUES (?, ?, ?)", tags
+            )
+            self._bump_version()
+        return len(rows)
+
+    def delete(self, event_ids: Iterable[str]) -> None:
+        ids = [(i,) for i in event_ids]
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM events WHERE id = ?", ids)
+            self._bump_version()
+
+    def _matching(self, start: Optional[date], end: Optional[date], crafts: Optional[List[str]]):
+        """SELECT of the events overlapping [start, end], with its parameters.
+
+        With a lower bound the result is the union of regular events starting
+        in [start - max_span, end] (a range on idx_events_start) and the long
+        events that started earlier (idx_events_long). INDEXED BY pins those
+        plans, since the planner would otherwise pick idx_events_end for a
+        catalog without statistics and read every later event.
+        """
+        tag_clause, tag_params = "", []
+        if crafts:
+            tags = sorted({c.lower() for c in crafts} | {"all"})
+            tag_clause = f" AND id IN (SELECT event_id FROM event_tags WHERE tag IN ({', '.join('?' * len(tags))}))"
+            tag_params = tags
+        if start is None:
+            if end is None:
+                return f"{_SELECT} WHERE 1 = 1{tag_clause}", tag_params
+            return f"{_SELECT} WHERE start_date <= ?{tag_clause}", [end.isoformat(), *tag_params]
+        lowest = (start - timedelta(days=self._max_span())).isoformat()
+        upper, upper_params = ("", []) if end is None else (" AND start_date <= ?", [end.isoformat()])
+        regular = (f"SELECT {_FIELDS} FROM events INDEXED BY idx_events_start"
+                   f" WHERE start_date >= ?{upper} AND end_date >= ?{tag_clause}")
+        long = (f"SELECT {_FIELDS} FROM events INDEXED BY idx_events_long"
+                f" WHERE span_days > {LONG_SPAN_DAYS} AND end_date >= ? AND start_date < ?{tag_clause}")
+        params = [lowest, *upper_params, start.isoformat(), *tag_params,
+                  start.isoformat(), lowest, *tag_params]
+        return f"SELECT * FROM ({regular} UNION ALL {long})", params
+
+    def query(self, start: Optional[date] = None, end: Optional[date] = None,
+              crafts: Optional[List[str]] = None, limit: Optional[int] = None, offset: int = 0,
+              today: Optional[date] = None) -> List[Dict[str, Any]]:
+        """Events overlapping [start, end] (either bound optional), optionally craft-filtered.
+
+        Ordered by (start_date, title). When `today` is given, the order is
+        instead ongoing, then upcoming, then ended, each group by start date
+        (oldest first), as on the events list. `limit`/`offset` page through
+        the result.
+        """
+        if today is None:
+            order, order_params = " ORDER BY start_date, title", []
+        else:
+            order = (" ORDER BY CASE WHEN start_date <= ? AND end_date >= ? THEN 0"
+                     " WHEN start_date > ? THEN 1 ELSE 2 END, start_date, title")
+            order_params = [today.isoformat()] * 3
+        page, page_params = ("", []) if limit is None else (" LIMIT ? OFFSET ?", [limit, offset])
+        with self._lock:
+            sql, params = self._matching(start, end, crafts)
+            rows = self._conn.execute(sql + order + page, params + order_params + page_params).fetchall()
+        return [_row_to_event(r) for r in rows]
+
+    def count(self, start: Optional[date] = None, end: Optional[date] = None,
+              crafts: Optional[List[str]] = None) -> int:
+        with self._lock:
+            sql, params = self._matching(start, end, crafts)
+            return self._conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+
+    def get_many(self, event_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Events with the given ids (unknown ids are skipped), ordered by (start_date, title)."""
+        ids = list(event_ids)
+        if not ids:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"{_SELECT} WHERE id IN ({', '.join('?' * len(ids))}) ORDER BY start_date, title", ids
+            ).fetchall()
+        return [_row_to_event(r) for r in rows]
+
+    def tags(self) -> List[str]:
+        """All craft tag labels in the catalog, sorted."""
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT label FROM event_tags ORDER BY label")]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
@@ -1,12 +1,53 @@
 import streamlit as st
-import pyrebase
+import atexit
+import base64
+import hashlib
 import json
-from typing import Dict, Any
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+import firebase_local # In-memory pyrebase stand-in for offline benchmarking / tests
+
+# Write-behind for user records: rapid saves for the same uid are coalesced
+# and written once the user has been idle for SAVE_DEBOUNCE_SECONDS (but no
+# later than SAVE_MAX_DELAY_SECONDS after the first unsaved change).
+SAVE_DEBOUNCE_SECONDS = 1.5
+SAVE_MAX_DELAY_SECONDS = 10.0
+
+# ID tokens this process has verified (or received straight from Firebase) are
+# trusted until shortly before their `exp`, so page refreshes skip the
+# get_account_info round trip. Tokens are refreshed TOKEN_REFRESH_MARGIN_SECONDS
+# before they expire; after a failed refresh the next attempt waits
+# TOKEN_REFRESH_RETRY_SECONDS.
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+TOKEN_REFRESH_RETRY_SECONDS = 30
+_MAX_VERIFIED_TOKENS = 1024
+_verified_tokens: "OrderedDict[str, tuple]" = OrderedDict() # sha256(token) -> (exp, user_info)
+_token_lock = threading.Lock()
 
 # Use st.cache_resource to initialize Firebase only once
 @st.cache_resource
 def init_firebase():
-    """Initializes and returns the Pyrebase app object."""
+    """Initializes and returns the Pyrebase app object.
+
+    With FIREBASE_BACKEND=memory (env) or firebase_backend = "memory" (secrets),
+    returns the in-process stand-in from firebase_local.py instead, configured
+    from the optional [firebase_local] secrets table and FIREBASE_LOCAL_* env vars.
+    """
+    try:
+        backend = os.environ.get("FIREBASE_BACKEND") or st.secrets.get("firebase_backend", "pyrebase")
+    except FileNotFoundError: # no secrets.toml at all
+        backend = "pyrebase"
+    if backend == "memory":
+        try:
+            settings = dict(st.secrets.get("firebase_local", {}))
+        except FileNotFoundError:
+            settings = {}
+        return firebase_local.from_settings(settings)
+    import pyrebase # imported here: it is slow to import and not needed by the in-memory backend
     config = dict(st.secrets["firebase_config"])
     firebase = pyrebase.initialize_app(config)
     return firebase
@@ -15,6 +56,7 @@ def sign_up(auth, email, password):
     """Signs up a new user and returns user info or an error message."""
     try:
         user = auth.create_user_with_email_and_password(email, password)
+        _remember_verified_token(user)
         return user, None
     except Exception as e:
         try:
@@ -29,6 +71,7 @@ def login(auth, email, password):
     """Logs in an existing user and returns user info or an error message."""
     try:
         user = auth.sign_in_with_email_and_password(email, password)
+        _remember_verified_token(user)
         return user, None
     except Exception as e:
         try:
@@ -38,8 +81,80 @@ def login(auth, email, password):
             error_message = str(e)
         return None, error_message
 
+class _PendingSave:
+    def __init__(self, db, data, token, first_queued):
+        self.db = db
+        self.data = data
+        self.token = token
+        self.first_queued = first_queued
+        self.timer: Optional[threading.Timer] = None
+
+_pending_saves: Dict[str, _PendingSave] = {}
+_save_errors: Dict[str, str] = {}
+_pending_lock = threading.Lock()
+_uid_write_locks: Dict[str, threading.Lock] = {} # keeps each uid's writes in order
+
+def _write_user_data(db, uid: str, data: Dict[str, Any], token: str = None):
+    if token:
+        # Use token for authenticated access
+        db.child("users").child(uid).set(data, token=token)
+    else:
+        # Fallback without token (may fail if rules require auth)
+        db.child("users").child(uid).set(data)
+
+def _flush_one(uid: str) -> bool:
+    with _pending_lock:
+        write_lock = _uid_write_locks.setdefault(uid, threading.Lock())
+    # Holding the uid's lock from pop to write means an older record can never land after a newer one
+    with write_lock:
+        with _pending_lock:
+            pending = _pending_saves.pop(uid, None)
+            if pending is None:
+                return True
+            if pending.timer is not None:
+                pending.timer.cancel()
+        try:
+            _write_user_data(pending.db, uid, pending.data, pending.token)
+            return True
+        except Exception as e:
+            with _pending_lock:
+                _save_errors[uid] = str(e)
+            return False
+
+def queue_user_data(db, uid: str, data: Dict[str, Any], token: str = None):
+    """Schedules a save of user data without blocking the rerun.
+
+    Only the latest record per uid is written (each save is a full `set`), once
+    the user stops changing things for SAVE_DEBOUNCE_SECONDS. Errors from the
+    background write are kept for take_save_error().
+    """
+    now = time.monotonic()
+    with _pending_lock:
+        previous = _pending_saves.get(uid)
+        first_queued = previous.first_queued if previous else now
+        if previous and previous.timer is not None:
+            previous.timer.cancel()
+        pending = _pending_saves[uid] = _PendingSave(db, data, token, first_queued)
+        delay = min(SAVE_DEBOUNCE_SECONDS, max(0.0, first_queued + SAVE_MAX_DELAY_SECONDS - now))
+        pending.timer = threading.Timer(delay, _flush_one, args=(uid,))
+        pending.timer.daemon = True
+        pending.timer.start()
+
+def flush_user_data(uid: str = None) -> bool:
+    """Writes pending saves now (for one uid, or all). Returns False if any write failed."""
+    with _pending_lock:
+        uids = [uid] if uid is not None else list(_pending_saves)
+    return all([_flush_one(u) for u in uids])
+
+def take_save_error(uid: str) -> Optional[str]:
+    """Returns (and clears) the last background save error for a uid, if any."""
+    with _pending_lock:
+        return _save_errors.pop(uid, None)
+
+atexit.register(flush_user_data)
+
 def save_user_data(db, uid: str, data: Dict[str, Any], token: str = None):
-    """Saves user data (preferences, reminders) to the Realtime Database.
+    """Saves user data (preferences, reminders) to the Realtime Database and waits for the write.
     
     Args:
         db: Firebase database instance
@@ -47,17 +162,12 @@ def save_user_data(db, uid: str, data: Dict[str, Any], token: str = None):
         data: Data to save
         token: Firebase auth token (idToken) - required for authenticated access
     """
-    try:
-        if token:
-            # Use token for authenticated access
-            db.child("users").child(uid).set(data, token=token)
-        else:
-            # Fallback without token (may fail if rules require auth)
-            db.child("users").child(uid).set(data)
+    # Goes through the write-behind queue so it supersedes any pending save for this uid
+    queue_user_data(db, uid, data, token=token)
+    if flush_user_data(uid):
         return True
-    except Exception as e:
-        st.error(f"Database Error: Failed to save user data. {e}")
-        return False
+    st.error(f"Database Error: Failed to save user data. {take_save_error(uid)}")
+    return False
 
 def load_user_data(db, uid: str, token: str = None) -> Dict[str, Any]:
     """Loads user data from the Realtime Database.
@@ -67,6 +177,8 @@ def load_user_data(db, uid: str, token: str = None) -> Dict[str, Any]:
         uid: User ID
         token: Firebase auth token (idToken) - required for authenticated access
     """
+    # Read-your-writes: land any queued save for this user first
+    flush_user_data(uid)
     try:
         if token:
             # Use token for authenticated access
@@ -91,6 +203,8 @@ def refresh_token(auth, refresh_token: str):
     """
     try:
         user = auth.refresh(refresh_token)
+        # pyrebase's refresh response names the uid 'userId'
+        _remember_verified_token({'localId': user.get('userId'), **user})
         return user, None
     except Exception as e:
         try:
@@ -122,6 +236,7 @@ def verify_token(auth, id_token: str):
                 'idToken': id_token,
                 'refreshToken': None  # We don't get refresh token from account info
             }
+            _remember_verified_token(user_info)
             return user_info, None
         return None, "Invalid token"
     except Exception as e:
@@ -130,4 +245,61 @@ def verify_token(auth, id_token: str):
             error_message = json.loads(error_json)['error']['message']
         except (IndexError, KeyError, json.JSONDecodeError):
             error_message = str(e)
-        return None, error_message
\ No newline at end of file
+        return None, error_message
+
+def token_expiry(id_token: str) -> Optional[float]:
+    """Reads the `exp` claim (epoch seconds) from a JWT. The signature is NOT checked."""
+    try:
+        payload = id_token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+def token_expires_soon(id_token: str, margin: float = TOKEN_REFRESH_MARGIN_SECONDS) -> bool:
+    """True if the token expires within `margin` seconds (False when its expiry can't be read)."""
+    exp = token_expiry(id_token)
+    return exp is not None and exp - time.time() <= margin
+
+def _token_key(id_token: str) -> str:
+    return hashlib.sha256(id_token.encode("utf-8")).hexdigest()
+
+def _remember_verified_token(user_info: Dict[str, Any]):
+    id_token = user_info.get('idToken') if user_info else None
+    exp = token_expiry(id_token) if id_token else None
+    if exp is None:
+        return
+    cached = {
+        'localId': user_info.get('localId'),
+        'email': user_info.get('email'),
+        'idToken': id_token,
+        'refreshToken': None,
+    }
+    with _token_lock:
+        _verified_tokens[_token_key(id_token)] = (exp, cached)
+        _verified_tokens.move_to_end(_token_key(id_token))
+        while len(_verified_tokens) > _MAX_VERIFIED_TOKENS:
+            _verified_tokens.popitem(last=False)
+
+def verify_token_cached(auth, id_token: str):
+    """verify_token() without the network round trip for tokens already verified here.
+
+    The local `exp` check only bounds how long a verified token is trusted; a
+    token this process has not seen is always verified remotely, since its
+    signature is not checked locally. Expired tokens fail without a round trip.
+
+    Returns:
+        Tuple of (user_info, error_message)
+    """
+    exp = token_expiry(id_token)
+    if exp is not None and exp <= time.time():
+        with _token_lock:
+            _verified_tokens.pop(_token_key(id_token), None)
+        return None, "TOKEN_EXPIRED"
+    with _token_lock:
+        entry = _verified_tokens.get(_token_key(id_token))
+        if entry is not None:
+            _verified_tokens.move_to_end(_token_key(id_token))
+    if entry is not None:
+        return dict(entry[1]), None
+    return verify_token(auth, id_token)
@@ -0,0 +1,272 @@
+# firebase_local.py
+"""In-process stand-in for the pyrebase auth/database surface used by the app.
+
+Select it with `firebase_backend = "memory"` in secrets.toml or
+FIREBASE_BACKEND=memory in the environment. The app, benchmarks and load tests
+then run without a Firebase project. Every call can be slowed down by an
+artificial latency (plus jitter) and can fail at a configurable rate, so
+the app's behavior under realistic backend delays can be measured.
+
+Only what firebase_auth.py uses is implemented:
+- auth: create_user_with_email_and_password, sign_in_with_email_and_password,
+  refresh and get_account_info;
+- database: child(...).set/update/get/remove, optionally with token=....
+
+Errors are raised like pyrebase raises them: args[1] is the Firebase JSON
+error body, so firebase_auth's error parsing works unchanged. ID tokens are
+unsigned JWTs with a real `exp` claim.
+"""
+
+import base64
+import copy
+import hashlib
+import json
+import os
+import random
+import secrets
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+DEFAULT_TOKEN_TTL_SECONDS = 3600
+
+# Environment overrides (take precedence over the [firebase_local] secrets table)
+ENV_SETTINGS = {
+    "FIREBASE_LOCAL_LATENCY_MS": ("latency_ms", float),
+    "FIREBASE_LOCAL_JITTER_MS": ("jitter_ms", float),
+    "FIREBASE_LOCAL_FAILURE_RATE": ("failure_rate", float),
+    "FIREBASE_LOCAL_TOKEN_TTL": ("token_ttl_seconds", float),
+    "FIREBASE_LOCAL_REQUIRE_AUTH": ("require_auth", lambda v: v.lower() in ("1", "true", "yes")),
+    "FIREBASE_LOCAL_SEED": ("seed", int),
+}
+
+
+class LocalFirebaseError(Exception):
+    """Raised like pyrebase's HTTPError: args = (summary, JSON error body)."""
+
+    def __init__(self, code: int, message: str):
+        body = json.dumps({"error": {"code": code, "message": message}})
+        super().__init__(f"{code} {message}", body)
+
+
+def _b64(data: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+class _Snapshot:
+    def __init__(self, key: Optional[str], value: Any):
+        self._key = key
+        self._value = value
+
+    def val(self) -> Any:
+        return self._value
+
+    def key(self) -> Optional[str]:
+        return self._key
+
+
+class LocalFirebase:
+    """Shared state for one fake project; hand out auth() / database() like pyrebase."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, failure_rate: float = 0.0,
+                 token_ttl_seconds: float = DEFAULT_TOKEN_TTL_SECONDS, require_auth: bool = False,
+                 seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.token_ttl_seconds = token_ttl_seconds
+        self.require_auth = require_auth
+        self.stats: Counter = Counter() # calls per operation, plus "<op>.failed"
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._users: Dict[str, Dict[str, Any]] = {} # email -> {localId, email, password_hash}
+        self._refresh_tokens: Dict[str, str] = {} # refresh token -> localId
+        self._data: Dict[str, Any] = {}
+
+    def auth(self) -> "_Auth":
+        return _Auth(self)
+
+    def database(self) -> "_Database":
+        return _Database(self, ())
+
+    def _call(self, op: str) -> None:
+        """Apply the configured latency / failure injection for one backend call."""
+        with self._lock:
+            self.stats[op] += 1
+            delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+            fail = self._random.random() < self.failure_rate
+            if fail:
+                self.stats[f"{op}.failed"] += 1
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise LocalFirebaseError(503, "UNAVAILABLE")
+
+    def _issue_tokens(self, local_id: str, email: Optional[str]) -> Dict[str, str]:
+        now = int(time.time())
+        claims = {"sub": local_id, "user_id": local_id, "email": email,
+                  "iat": now, "exp": now + int(self.token_ttl_seconds)}
+        id_token = f"{_b64({'alg': 'none', 'typ': 'JWT'})}.{_b64(claims)}.{secrets.token_hex(8)}"
+        refresh = secrets.token_urlsafe(24)
+        self._refresh_tokens[refresh] = local_id
+        return {"idToken": id_token, "refreshToken": refresh, "expiresIn": str(int(self.token_ttl_seconds))}
+
+    def _claims(self, id_token: str) -> Dict[str, Any]:
+        """Decode one of our own ID tokens; raises like Firebase for bad/expired ones."""
+        try:
+            payload = id_token.split(".")[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        except (AttributeError, IndexError, ValueError):
+            raise LocalFirebaseError(400, "INVALID_ID_TOKEN")
+        if claims.get("exp", 0) <= time.time():
+            raise LocalFirebaseError(400, "TOKEN_EXPIRED")
+        return claims
+
+
+def _password_hash(email: str, password: str) -> str:
+    return hashlib.sha256(f"{email}\n{password}".encode("utf-8")).hexdigest()
+
+
+class _Auth:
+    def __init__(self, app: LocalFirebase):
+        self._app = app
+
+    def create_user_with_email_and_password(self, email: str, password: str) -> Dict[str, Any]:
+        app = self._app
+        app._call("auth.sign_up")
+        if not email or "@" not in email:
+            raise LocalFirebaseError(400, "INVALID_EMAIL")
+        if not password or len(password) < 6:
+            raise LocalFirebaseError(400, "WEAK_PASSWORD : Password should be at least 6 characters")
+        with app._lock:
+            if email.lower() in app._users:
+                raise LocalFirebaseError(400, "EMAIL_EXISTS")
+            local_id = secrets.token_hex(14)
+            app._users[email.lower()] = {"localId": local_id, "email": email,
+                                         "password_hash": _password_hash(email.lower(), password)}
+            tokens = app._issue_tokens(local_id, email)
+        return {"kind": "identitytoolkit#SignupNewUserResponse", "localId": local_id, "email": email, **tokens}
+
+    def sign_in_with_email_and_password(self, email: str, password: str) -> Dict[str, Any]:
+        app = self._app
+        app._call("auth.sign_in")
+        with app._lock:
+            user = app._users.get((email or "").lower())
+            if user is None or user["password_hash"] != _password_hash(email.lower(), password or ""):
+                raise LocalFirebaseError(400, "INVALID_LOGIN_CREDENTIALS")
+            tokens = app._issue_tokens(user["localId"], user["email"])
+        return {"kind": "identitytoolkit#VerifyPasswordResponse", "localId": user["localId"],
+                "email": user["email"], "registered": True, **tokens}
+
+    def refresh(self, refresh_token: str) -> Dict[str, Any]:
+        app = self._app
+        app._call("auth.refresh")
+        with app._lock:
+            local_id = app._refresh_tokens.get(refresh_token)
+            if local_id is None:
+                raise LocalFirebaseError(400, "INVALID_REFRESH_TOKEN")
+            email = next((u["email"] for u in app._users.values() if u["localId"] == local_id), None)
+            tokens = app._issue_tokens(local_id, email)
+        # pyrebase's refresh() returns userId / idToken / refreshToken only
+        return {"userId": local_id, "idToken": tokens["idToken"], "refreshToken": tokens["refreshToken"]}
+
+    def get_account_info(self, id_token: str) -> Dict[str, Any]:
+        app = self._app
+        app._call("auth.get_account_info")
+        claims = app._claims(id_token)
+        with app._lock:
+            user = next((u for u in app._users.values() if u["localId"] == claims.get("sub")), None)
+        if user is None:
+            raise LocalFirebaseError(400, "USER_NOT_FOUND")
+        return {"kind": "identitytoolkit#GetAccountInfoResponse",
+                "users": [{"localId": user["localId"], "email": user["email"], "emailVerified": False}]}
+
+
+class _Database:
+    """Path reference into the shared JSON tree (child() returns a new reference)."""
+
+    def __init__(self, app: LocalFirebase, path: tuple):
+        self._app = app
+        self._path = path
+
+    def child(self, *parts: Any) -> "_Database":
+        segments = [s for p in parts for s in str(p).split("/") if s]
+        return _Database(self._app, self._path + tuple(segments))
+
+    def _check_token(self, token: Optional[str]) -> None:
+        if token is not None:
+            self._app._claims(token)
+        elif self._app.require_auth:
+            raise LocalFirebaseError(401, "Permission denied")
+
+    def _parent(self, create: bool):
+        node = self._app._data
+        for seg in self._path[:-1]:
+            nxt = node.get(seg) if isinstance(node, dict) else None
+            if not isinstance(nxt, dict):
+                if not create:
+                    return None
+                nxt = node[seg] = {}
+            node = nxt
+        return node
+
+    def set(self, data: Any, token: Optional[str] = None) -> Any:
+        self._app._call("db.set")
+        self._check_token(token)
+        # JSON round trip mirrors what the REST API would accept and store
+        value = json.loads(json.dumps(data))
+        with self._app._lock:
+            if not self._path:
+                self._app._data = value if isinstance(value, dict) else {}
+            else:
+                self._parent(create=True)[self._path[-1]] = value
+        return copy.deepcopy(value)
+
+    def update(self, data: Dict[str, Any], token: Optional[str] = None) -> Dict[str, Any]:
+        self._app._call("db.update")
+        self._check_token(token)
+        value = json.loads(json.dumps(data))
+        with self._app._lock:
+            node = self._app._data
+            if self._path:
+                parent = self._parent(create=True)
+                if not isinstance(parent.get(self._path[-1]), dict):
+                    parent[self._path[-1]] = {}
+                node = parent[self._path[-1]]
+            node.update(value)
+        return copy.deepcopy(value)
+
+    def get(self, token: Optional[str] = None) -> _Snapshot:
+        self._app._call("db.get")
+        self._check_token(token)
+        with self._app._lock:
+            if not self._path:
+                value = self._app._data
+            else:
+                parent = self._parent(create=False)
+                value = parent.get(self._path[-1]) if parent is not None else None
+            value = copy.deepcopy(value)
+        return _Snapshot(self._path[-1] if self._path else None, value)
+
+    def remove(self, token: Optional[str] = None) -> None:
+        self._app._call("db.remove")
+        self._check_token(token)
+        with self._app._lock:
+            if not self._path:
+                self._app._data = {}
+                return
+            parent = self._parent(create=False)
+            if parent is not None:
+                parent.pop(self._path[-1], None)
+
+
+def from_settings(settings: Optional[Dict[str, Any]] = None) -> LocalFirebase:
+    """Build a LocalFirebase from a settings dict (e.g. secrets [firebase_local]) plus env overrides."""
+    options = {k: v for k, v in dict(settings or {}).items()
+               if k in {name for name, _ in ENV_SETTINGS.values()}}
+    for env_name, (option, parse) in ENV_SETTINGS.items():
+        raw = os.environ.get(env_name)
+        if raw not in (None, ""):
+            options[option] = parse(raw)
+    return LocalFirebase(**options)
@@ -2,25 +2,32 @@
 
 # --- IMPORTS ---
 import streamlit as st
+import time
 from datetime import date, timedelta
-import calendar
+import metrics
 
 # Import from backend file
 from backend import (
-    t, get_image_as_base64, load_dummy_events, filter_events_by_crafts,
-    days_until, format_days, clean_day_artifacts, get_ai_content,
-    generate_image_with_imagen, get_ai_content_from_image,
-    get_market_trends, get_growth_plan, parse_firebase_error,
-    auth_handler, db_handler, translations, firebase_auth
+    t, get_static_assets, get_background_css, get_event_store, EVENTS_PAGE_SIZE,
+    render_month_calendar, month_events,
+    days_until, format_days, clean_day_artifacts,
+    generate_kit_with_image, generate_kit_with_image_multi,
+    localize_kits, image_thumbnail_path,
+    get_ai_content_from_image, prefetch_upload,
+    stream_market_trends, stream_growth_plan,
+    parse_firebase_error,
+    require_firebase, start_metrics, translations, I18N, firebase_auth
 )
 
 # --- UI HELPER FUNCTIONS ---
 def clear_results():
     st.session_state.ai_results = None
+    st.session_state.kit_variants = None
     st.session_state.generated_image = None
     st.session_state.uploaded_image = None
     st.session_state.market_trends = None
     st.session_state.growth_plan = None
+    st.session_state.pending_report = None
     st.session_state.story_is_ready = False
     st.session_state.current_prompt_fields = {}
 
@@ -33,6 +40,11 @@ st.set_page_config(
     layout="wide",
 )
 
+# --- INSTRUMENTATION ---
+# Per-section rerun timings; a no-op unless metrics are enabled (see metrics.py)
+start_metrics()
+_laps = metrics.laps("artisan_frontend_section_seconds", "artisan_frontend_rerun_seconds")
+
 final_theme_css = f"""
 <style>
     :root {{
@@ -87,11 +99,11 @@ final_theme_css = f"""
 """
 st.markdown(final_theme_css, unsafe_allow_html=True)
 
-logo_path = "logo.gif"
-logo_base64 = get_image_as_base64(logo_path)
-if logo_base64:
+# Logo/background are served as cached static files (see static_assets.py), not inline base64
+logo_url = get_static_assets()["logo"]
+if logo_url:
     st.markdown(
-        f'<link rel="icon" href="data:image/gif;base64,{logo_base64}" type="image/gif">',
+        f'<link rel="icon" href="{logo_url}" type="image/gif">',
         unsafe_allow_html=True,
     )
 login_register_input_css = """
@@ -121,6 +133,15 @@ st.markdown(login_register_input_css, unsafe_allow_html=True)
 
 st.markdown("""
 <style>
+    /* Month grid: weekday header row + one cell per day */
+    .calendar-grid {
+        display:grid;
+        grid-template-columns:repeat(7, minmax(0, 1fr));
+        gap:1rem;
+        margin-bottom:1rem;
+    }
+    .calendar-grid .calendar-dow { text-align:center; font-weight:600; }
+
     /* Calendar layout fix: keep date at top, events below (no overlay) */
     .calendar-cell {
         min-height:120px;
@@ -364,6 +385,7 @@ div[data-testid="stMultiSelect"] input {
 }
 </style>
 """, unsafe_allow_html=True)
+_laps.mark("css")
 
 
 # --- SESSION STATE INITIALIZATION ---
@@ -371,13 +393,15 @@ if 'logged_in' not in st.session_state: st.session_state.logged_in = False
 if 'user_info' not in st.session_state: st.session_state.user_info = None
 if 'user' not in st.session_state:
     st.session_state['user'] = {'uid': 'guest', 'email': 'guest@example.com', 'preferred_crafts': []}
-if 'events' not in st.session_state: st.session_state['events'] = load_dummy_events()
 if 'reminders' not in st.session_state: st.session_state['reminders'] = {} # dict: uid -> [event_ids]
 if 'ai_results' not in st.session_state: st.session_state.ai_results = None
+if 'kit_variants' not in st.session_state: st.session_state.kit_variants = None # {language: kit} for multi-language kits
 if 'generated_image' not in st.session_state: st.session_state.generated_image = None
 if 'uploaded_image' not in st.session_state: st.session_state.uploaded_image = None
 if 'market_trends' not in st.session_state: st.session_state.market_trends = None
 if 'growth_plan' not in st.session_state: st.session_state.growth_plan = None
+if 'pending_report' not in st.session_state: st.session_state.pending_report = None # report to stream on this rerun
+if 'events_pages' not in st.session_state: st.session_state.events_pages = 1 # pages of the events list shown
 if 'story_is_ready' not in st.session_state: st.session_state.story_is_ready = False
 if 'current_prompt_fields' not in st.session_state: st.session_state.current_prompt_fields = {}
 if 'selected_workflow_key' not in st.session_state:
@@ -403,6 +427,9 @@ if 'calendar_year' not in st.session_state: st.session_state.calendar_year = dat
 if 'calendar_month' not in st.session_state: st.session_state.calendar_month = date(2025,9,12).month
 if 'reminder_days' not in st.session_state: st.session_state.reminder_days = 14
 
+# Firebase clients are created on first use (the first run after a cold start pays for it)
+auth_handler, db_handler = require_firebase()
+
 # --- SESSION PERSISTENCE: Restore session on page refresh ---
 if 'session_restored' not in st.session_state:
     st.session_state.session_restored = False
@@ -416,8 +443,8 @@ if not st.session_state.session_restored:
     
     if stored_token and stored_uid and stored_email:
         try:
-            # Verify the stored token is still valid
-            user_info, err = firebase_auth.verify_token(auth_handler, stored_token)
+            # Verify the stored token is still valid (no round trip if this server already verified it)
+            user_info, err = firebase_auth.verify_token_cached(auth_handler, stored_token)
             
             if user_info and not err:
                 # Token is valid, restore the session
@@ -464,6 +491,40 @@ if not st.session_state.session_restored:
     
     st.session_state.session_restored = True
 
+# --- TOKEN REFRESH: renew the idToken shortly before it expires ---
+if st.session_state.logged_in and st.session_state.user_info:
+    current_token = st.session_state.user_info.get('idToken')
+    current_refresh = st.session_state.user_info.get('refreshToken') or st.query_params.get("refresh")
+    # A failed refresh is retried only after a pause, so a dead refresh token doesn't block every rerun
+    retry_at = st.session_state.get('token_refresh_retry_at', 0.0)
+    if (current_token and current_refresh and time.time() >= retry_at
+            and firebase_auth.token_expires_soon(current_token)):
+        refreshed_user, refresh_err = firebase_auth.refresh_token(auth_handler, current_refresh)
+        if refreshed_user and not refresh_err:
+            st.session_state.pop('token_refresh_retry_at', None)
+            st.session_state.user_info = {
+                **st.session_state.user_info,
+                'idToken': refreshed_user.get('idToken'),
+                'refreshToken': refreshed_user.get('refreshToken', current_refresh)
+            }
+            current_token = st.session_state.user_info['idToken']
+            if st.query_params.get("token"):
+                st.query_params.update({
+                    "token": current_token,
+                    "refresh": st.session_state.user_info['refreshToken']
+                })
+        else:
+            st.session_state.token_refresh_retry_at = time.time() + firebase_auth.TOKEN_REFRESH_RETRY_SECONDS
+    if current_token and firebase_auth.token_expires_soon(current_token, margin=0):
+        # The token has expired and could not be renewed: end the session instead of using it
+        if st.session_state.get('user'):
+            firebase_auth.flush_user_data(st.session_state['user']['uid'])
+        st.query_params.clear()
+        for k in list(st.session_state.keys()):
+            del st.session_state[k]
+        st.rerun()
+_laps.mark("session_restore")
+
 # --- LOGIN / REGISTER PAGE ---
 def show_login_page():
     # --- VISUAL CONTAINER STYLE ---
@@ -486,18 +547,18 @@ def show_login_page():
     # --- LOGO AND TITLE ---
     logo_path = "logo.gif"
     app_title_text = t('app_title', 'English') 
-    try:
-        logo_base64 = get_image_as_base64(logo_path)
+    logo_url = get_static_assets()["logo"]
+    if logo_url:
         st.markdown(
             f"""
             <div style="text-align: center;">
-                <img src="data:image/gif;base64,{logo_base64}" width="120" style="margin-bottom: 0.5rem; margin-top: -3rem;">
+                <img src="{logo_url}" width="120" style="margin-bottom: 0.5rem; margin-top: -3rem;">
                 <h1 style="font-family: 'serif'; font-weight: 600; font-size: 3rem; color: #5D4037; margin: -5;margin-top: -3rem;">{app_title_text}</h1>
             </div>
             """,
             unsafe_allow_html=True
         )
-    except FileNotFoundError:
+    else:
         st.title(f"🏺 {app_title_text}")
         st.warning(f"Logo file '{logo_path}' not found.")
 
@@ -554,11 +615,10 @@ def show_login_page():
 def show_main_app():
     page_language = st.query_params.get("lang", "English")
 
-    logo_path = "logo.gif"
-    logo_base64 = get_image_as_base64(logo_path)
+    logo_url = get_static_assets()["logo"]
     app_title_text = t('app_title', page_language) # Get title text
 # This block creates a single, stable title element with the logo
-    if logo_base64:
+    if logo_url:
         st.markdown(
             f"""
             <style>
@@ -580,7 +640,7 @@ def show_main_app():
             </style>
 
             <div class="title-container">
-                <img src="data:image/gif;base64,{logo_base64}" width="120">
+                <img src="{logo_url}" width="120">
                 <h1 class="title-text">{app_title_text}</h1>
             </div>
             """,
@@ -597,7 +657,12 @@ def show_main_app():
 
         if st.session_state.user_info:
             st.write(f"Welcome, {st.session_state.user_info.get('email','Artisan')}!")
+            save_error = firebase_auth.take_save_error(st.session_state['user']['uid'])
+            if save_error:
+                st.error(f"Database Error: Failed to save user data. {save_error}")
             if st.button("Logout"):
+                # Land any debounced preference/reminder save before the session is cleared
+                firebase_auth.flush_user_data(st.session_state['user']['uid'])
                 st.session_state.logged_in = False
                 st.session_state.user_info = None
                 keep = ['logged_in','user_info']
@@ -606,7 +671,7 @@ def show_main_app():
                         del st.session_state[k]
                 st.rerun()
 
-        page_language_list = list(translations.keys())
+        page_language_list = I18N.languages()
         content_language_list = ["English","Hindi","Hinglish","Bengali","Tamil","Gujarati","Marathi","Telugu","Kannada","Malayalam","Odia","Punjabi","Urdu"]
 
         def on_lang_change():
@@ -673,7 +738,7 @@ def show_main_app():
         st.markdown(t('event_preferences_info', page_language))
 
         # --- Craft Tag Localization (Event Preferences) ---
-        all_tags_canonical = sorted({tag for ev in st.session_state['events'] for tag in ev['craft_tags']})
+        all_tags_canonical = get_event_store().tags()
 
         craft_tag_map_hi = {
             "Terracotta clay": "टेराकोटा मिट्टी",
@@ -732,13 +797,14 @@ def show_main_app():
             }
             # Pass the idToken for authenticated database access
             token = st.session_state.user_info.get('idToken') if st.session_state.user_info else None
-            firebase_auth.save_user_data(db_handler, uid, data_to_save, token=token)
+            firebase_auth.queue_user_data(db_handler, uid, data_to_save, token=token) # written in the background
             st.toast("Preferences saved!")
 
         st.session_state.reminder_days = st.number_input(
             t('notify_days_label', page_language),
             min_value=1, max_value=90, value=st.session_state.reminder_days
         )
+    _laps.mark("sidebar")
 
     if st.session_state.selected_workflow_key is None:
         st.markdown("### " + t('choose_path_header', page_language))
@@ -929,15 +995,26 @@ def show_main_app():
                 # This will cause the above 'if' block to run, replacing the uploader with the image.
                 if uploaded_file is not None:
                     st.session_state.uploaded_image = uploaded_file
+                    prefetch_upload(uploaded_file) # shrink/re-encode while the user fills in details
                     st.rerun()
 
         # --- COMMON ELEMENTS for workflow 1 ---
         st.text_area(t('desc_heading', page_language), key='common_description_area', placeholder=t('prompt_placeholder_description', page_language))
+        if source_choice == t('source_option_1', page_language):
+            st.checkbox(t('regenerate_label', page_language), key='kit_regenerate', help=t('regenerate_help', page_language))
+        extra_languages = st.multiselect(
+            t('extra_languages_label', page_language),
+            [lang for lang in content_language_list if lang != caption_language],
+            help=t('extra_languages_help', page_language),
+            key='extra_caption_languages'
+        )
 
         if st.button(t('generate_button', page_language), use_container_width=True, type="primary", key="generate_with_ai_or_upload"):
             if source_choice == t('source_option_1', page_language):
                 if st.session_state.get('ai_title'): # VALIDATION: Check for Title
-                    with st.spinner(t('spinner_text_content', page_language).format(caption_lang=caption_language)):
+                    spinner_text = t('spinner_text_content', page_language).format(caption_lang=caption_language) \
+                        + " " + t('spinner_text_image', page_language)
+                    with st.spinner(spinner_text):
                         final_fields = {
                             'title': st.session_state.get('ai_title',''),
                             'materials': st.session_state.get('ai_materials_other', st.session_state.get('ai_materials','')),
@@ -945,15 +1022,23 @@ def show_main_app():
                             'tone': st.session_state.get('ai_tone_other', st.session_state.get('ai_tone','')),
                             'description': st.session_state.get('common_description_area','')
                         }
-                        st.session_state.ai_results = get_ai_content(final_fields, caption_language)
+                        # Story/captions and the image are generated concurrently;
+                        # generated_image holds an image-store key, not the bitmap
+                        if extra_languages:
+                            # Extra languages are adapted from the one source kit, not regenerated
+                            kits, st.session_state.generated_image = generate_kit_with_image_multi(
+                                final_fields, [caption_language, *extra_languages],
+                                regenerate=st.session_state.get('kit_regenerate', False)
+                            )
+                            st.session_state.ai_results = kits[caption_language]
+                            st.session_state.kit_variants = {lang: kit for lang, kit in kits.items() if kit}
+                        else:
+                            st.session_state.ai_results, st.session_state.generated_image = generate_kit_with_image(
+                                final_fields, caption_language,
+                                regenerate=st.session_state.get('kit_regenerate', False)
+                            )
+                            st.session_state.kit_variants = None
                     if st.session_state.ai_results:
-                        parts = []
-                        for k in ['title','materials','region','tone','description']:
-                            v = final_fields.get(k)
-                            if v: parts.append(f"{k.capitalize()}: {v}")
-                        img_prompt = ", ".join(parts) or "Handcrafted Indian artisan item"
-                        with st.spinner(t('spinner_text_image', page_language)):
-                            st.session_state.generated_image = generate_image_with_imagen(img_prompt)
                         st.success(t('content_ready', page_language))
                 else:
                     st.warning(t('prompt_warning', page_language))
@@ -970,6 +1055,14 @@ def show_main_app():
                             caption_language,
                             description
                         )
+                    st.session_state.kit_variants = None
+                    if st.session_state.ai_results and extra_languages:
+                        with st.spinner(t('spinner_text_variants', page_language).format(langs=", ".join(extra_languages))):
+                            variants = localize_kits(st.session_state.ai_results, caption_language, extra_languages)
+                        st.session_state.kit_variants = {
+                            caption_language: st.session_state.ai_results,
+                            **{lang: kit for lang, kit in variants.items() if kit}
+                        }
 
                     if st.session_state.ai_results:
                         st.success(t('content_ready', page_language))
@@ -991,14 +1084,12 @@ def show_main_app():
         if st.button(t('trends_button', page_language), use_container_width=True):
             if craft_type and trends_region:
                 clear_results()
-                with st.spinner(
-                    t('spinner_text_trends', page_language).format(trends_lang=trends_language)
-                ):
-                    st.session_state.market_trends = get_market_trends(
-                        trends_region,
-                        trends_language,
-                        craft_type
-                    )
+                # Rendered progressively in the results section below
+                st.session_state.pending_report = {
+                    'kind': 'market_trends',
+                    'spinner': t('spinner_text_trends', page_language).format(trends_lang=trends_language),
+                    'args': (trends_region, trends_language, craft_type),
+                }
             else:
                 st.warning(t('trends_warning', page_language))
 
@@ -1022,8 +1113,12 @@ def show_main_app():
         if st.button(t('planner_button', page_language), use_container_width=True):
             if platforms and craft_type and planner_region:
                 clear_results()
-                with st.spinner(t('spinner_text_planner', page_language).format(plan_lang=plan_language)):
-                    st.session_state.growth_plan = get_growth_plan(planner_region, plan_language, platforms, craft_type, target_audience)
+                # Rendered progressively in the results section below
+                st.session_state.pending_report = {
+                    'kind': 'growth_plan',
+                    'spinner': t('spinner_text_planner', page_language).format(plan_lang=plan_language),
+                    'args': (planner_region, plan_language, platforms, craft_type, target_audience),
+                }
             else:
                 st.warning(t('planner_warning', page_language))
 
@@ -1039,37 +1134,28 @@ def show_main_app():
         uid = st.session_state['user']['uid']
         reminders_for_user = set(st.session_state['reminders'].get(uid, []))
 
-        # Filter by crafts first
-        base_events = filter_events_by_crafts(
-            st.session_state['events'],
-            st.session_state['user'].get('preferred_crafts', [])
-        )
+        # Each section queries only its own window from the event store (craft-filtered in SQL)
+        event_db = get_event_store()
+        preferred_crafts = st.session_state['user'].get('preferred_crafts', [])
 
         # Keep past events only if they ended within retention window
         retention_cutoff = today_ref - timedelta(days=retention_days)
-        visible_events = [
-            ev for ev in base_events
-            if not (ev['end_date'] < retention_cutoff) # drop very old past events
-        ]
 
         # Upcoming events (within user reminder window) for summary section (future or ongoing)
         upcoming_horizon = today_ref + timedelta(days=reminder_window_days)
-        upcoming_candidates = [
-            ev for ev in visible_events
-            if ev['start_date'] <= upcoming_horizon and ev['end_date'] >= today_ref
-        ]
+        upcoming_candidates = event_db.query(today_ref, upcoming_horizon, preferred_crafts)
 
         # Recently ended events (ended within retention window, i.e., last 14 days)
         recently_ended = [
-            ev for ev in visible_events
-            if ev['end_date'] < today_ref and ev['end_date'] >= retention_cutoff
+            ev for ev in event_db.query(retention_cutoff, today_ref, preferred_crafts)
+            if ev['end_date'] < today_ref
         ]
 
         def persist_reminders():
             st.session_state['reminders'][uid] = list(reminders_for_user)
             # Pass the idToken for authenticated database access
             token = st.session_state.user_info.get('idToken') if st.session_state.user_info else None
-            firebase_auth.save_user_data(
+            firebase_auth.queue_user_data( # debounced write-behind; rapid toggles coalesce into one write
                 db_handler,
                 uid,
                 {
@@ -1138,7 +1224,7 @@ def show_main_app():
                 st.rerun()
         with nav_c:
             st.markdown(
-                f"<h3 style='text-align:center;'>{calendar.month_name[st.session_state.calendar_month]} {st.session_state.calendar_year}</h3>",
+                f"<h3 style='text-align:center;'>{date(st.session_state.calendar_year, st.session_state.calendar_month, 1):%B} {st.session_state.calendar_year}</h3>",
                 unsafe_allow_html=True
             )
         with nav_r:
@@ -1146,83 +1232,33 @@ def show_main_app():
                 update_calendar_view("next")
                 st.rerun()
 
-        cal = calendar.Calendar()
-        month_matrix = cal.monthdayscalendar(st.session_state.calendar_year, st.session_state.calendar_month)
-        days_header = ["Mon","Tue","Wed","Thu","Fri","Sat","Sun"]
-        hdr_cols = st.columns(7)
-        for i, dw in enumerate(days_header):
-            with hdr_cols[i]:
-                st.markdown(f"<p style='text-align:center;font-weight:600;'>{dw}</p>", unsafe_allow_html=True)
-
-        today_fixed = today_ref # Align with new calendar baseline (or replace with date.today())
-        for week in month_matrix:
-            wk_cols = st.columns(7)
-            for i, day_val in enumerate(week):
-                with wk_cols[i]:
-                    if day_val == 0:
-                        st.markdown("<div class='calendar-cell empty'></div>", unsafe_allow_html=True)
-                        continue
-                    current_day = date(st.session_state.calendar_year, st.session_state.calendar_month, day_val)
-                    is_today = current_day == today_fixed
-                    is_past = current_day < today_fixed
-
-                    classes = ["calendar-cell"]
-                    if is_today: classes.append("is-today")
-                    if is_past: classes.append("is-past")
-
-                    day_events = [
-                        ev for ev in visible_events
-                        if ev['start_date'] <= current_day <= ev['end_date']
-                    ]
-                    day_events = filter_events_by_crafts(
-                        day_events,
-                        st.session_state['user'].get('preferred_crafts', [])
-                    )
-                    day_events_sorted = sorted(day_events, key=lambda ev: (ev['start_date'], ev['title']))
-
-                    bars_html = []
-                    for ev in day_events_sorted:
-                        bar_cls = ["event-bar"]
-                        start_flag = current_day == ev['start_date']
-                        end_flag = current_day == ev['end_date']
-                        if not (start_flag and end_flag):
-                            if start_flag:
-                                bar_cls.append("event-bar-start")
-                            elif end_flag:
-                                bar_cls.append("event-bar-end")
-                            else:
-                                bar_cls.append("event-bar-middle")
-                        if start_flag:
-                            # Clickable link jumps down to the detailed event section
-                            title_html = f"<a href='#event-{ev['id']}'>{ev['title']}</a>"
-                        else:
-                            title_html = "&nbsp;"
-                        bars_html.append(f"<div class='{' '.join(bar_cls)}'>{title_html}</div>")
-
-                    html = f"""
-                    <div class="{' '.join(classes)}">
-                        <div class="day-number">{day_val}</div>
-                        <div class="events-container">{''.join(bars_html)}</div>
-                    </div>
-                    """
-                    st.markdown(html, unsafe_allow_html=True)
+        # One cached HTML block for the whole month (header row included)
+        st.markdown(
+            render_month_calendar(
+                st.session_state.calendar_year,
+                st.session_state.calendar_month,
+                tuple(sorted(preferred_crafts)),
+                event_db.version,
+                today_ref,
+                retention_cutoff,
+            ),
+            unsafe_allow_html=True
+        )
 
         st.markdown("---")
         st.subheader(t('events_list_header', page_language))
 
-        # Reuse visible_events (already retention-filtered)
-        def event_sort_key(ev):
-            if ev['start_date'] <= today_ref <= ev['end_date']:
-                return (0, ev['start_date'])
-            elif ev['start_date'] > today_ref:
-                return (1, ev['start_date'])
-            else:
-                return (2, -((today_ref - ev['start_date']).days))
+        # Paged: ongoing first, then upcoming, then recently ended (ordered by the store)
+        visible_total = event_db.count(retention_cutoff, None, preferred_crafts)
+        visible_events = event_db.query(
+            retention_cutoff, None, preferred_crafts,
+            limit=st.session_state.events_pages * EVENTS_PAGE_SIZE, today=today_ref
+        )
 
         if not visible_events:
             st.info("No events match filters or are within retention window.")
         else:
-            for ev in sorted(visible_events, key=event_sort_key):
+            for ev in visible_events:
                 list_c1, list_c2 = st.columns([3,1])
                 with list_c1:
                     # Anchor target so calendar click scrolls here
@@ -1273,39 +1309,87 @@ def show_main_app():
                                 st.rerun()
                 st.markdown("---")
 
+            if len(visible_events) < visible_total:
+                more_label = t('show_more_events', page_language).format(shown=len(visible_events), total=visible_total)
+                if st.button(more_label, key="events_more", use_container_width=True):
+                    st.session_state.events_pages += 1
+                    st.rerun()
+
+            # Every bar on the month grid links to #event-<id>; events not on the pages shown
+            # above get a short entry here so those links still have a target
+            listed_ids = {ev['id'] for ev in visible_events}
+            unlisted = [
+                ev for ev in month_events(st.session_state.calendar_year, st.session_state.calendar_month,
+                                          preferred_crafts, retention_cutoff)
+                if ev['id'] not in listed_ids
+            ]
+            if unlisted:
+                st.markdown(f"**{t('more_this_month_header', page_language)}**")
+                for ev in unlisted:
+                    st.markdown(f"<div id='event-{ev['id']}'></div>", unsafe_allow_html=True)
+                    st.caption(f"{ev['title']} · {ev['start_date'].strftime('%b %d')} - "
+                               f"{ev['end_date'].strftime('%b %d, %Y')} · {ev.get('city')}")
+
+    _laps.mark("workflow")
+
     # --- RESULTS DISPLAY ---
-    if st.session_state.get('ai_results'):
+    if st.session_state.get('pending_report'):
+        # Stream the requested report chunk-by-chunk instead of waiting for the full text
+        # Cleared only once the stream is done: if a widget interaction interrupts this
+        # run, the next one streams the report again. While the upstream call is still
+        # in flight it re-attaches to it (single_flight replays the chunks so far)
+        report = st.session_state.pending_report
+        if report['kind'] == 'market_trends':
+            st.header(t('trends_results_header', page_language))
+            stream = stream_market_trends(*report['args'])
+        else:
+            st.header(t('planner_results_header', page_language))
+            stream = stream_growth_plan(*report['args'])
+        status = st.empty()
+        status.caption(report['spinner'])
+        text = st.write_stream(stream)
+        status.empty()
+        st.session_state[report['kind']] = text or None
+        st.session_state.pending_report = None
+    elif st.session_state.get('ai_results'):
         st.header(t('results_header', page_language))
+        kit = st.session_state.ai_results
+        variants = st.session_state.get('kit_variants') or {}
+        if len(variants) > 1:
+            # Only the selected language is rendered
+            kit_language = st.radio(t('kit_language_label', page_language), list(variants), horizontal=True, key='kit_variant_language')
+            kit = variants.get(kit_language, kit)
 
         # Check if a NEW image was generated by the AI
-        if st.session_state.get('generated_image'):
+        image_thumb = image_thumbnail_path(st.session_state.generated_image) if st.session_state.get('generated_image') else None
+        if image_thumb:
             # If yes, use a two-column layout to show the new image and the story
             col1, col2 = st.columns([1, 2])
             with col1:
-                st.image(st.session_state.generated_image, caption=t('ai_image_caption', page_language))
+                st.image(image_thumb, caption=t('ai_image_caption', page_language))
             with col2:
                 st.subheader(t('story_header', page_language))
-                st.write(st.session_state.ai_results.get('story', ''))
+                st.write(kit.get('story', ''))
         else:
             # If you used your own uploaded image, just show the story in a single column
             st.subheader(t('story_header', page_language))
-            st.write(st.session_state.ai_results.get('story', ''))
+            st.write(kit.get('story', ''))
 
         # The social media posts will appear below in either case
         st.subheader(t('social_header', page_language))
         insta, twit, face = st.tabs(["Instagram","Twitter / X","Facebook"])
         with insta:
-            ig = st.session_state.ai_results.get("instagram_post",{})
+            ig = kit.get("instagram_post",{})
             st.markdown(f"**{t('caption_suggestion', page_language)}**")
             st.markdown(ig.get("caption",""))
             st.markdown(f"**{t('hashtags', page_language)}**")
             st.code(ig.get("hashtags",""))
         with twit:
-            tw = st.session_state.ai_results.get("twitter_post",{})
+            tw = kit.get("twitter_post",{})
             st.markdown(f"**{t('tweet_suggestion', page_language)}**")
             st.markdown(tw.get("text",""))
         with face:
-            fb = st.session_state.ai_results.get("facebook_post",{})
+            fb = kit.get("facebook_post",{})
             st.markdown(f"**{t('caption_suggestion', page_language)}**")
             st.markdown(fb.get("caption",""))
             st.markdown(f"**{t('hashtags', page_language)}**")
@@ -1318,29 +1402,22 @@ def show_main_app():
         st.markdown(st.session_state.growth_plan)
     elif workflow_key != "events_calendar":
         st.info(t('info_box', page_language))
+    _laps.mark("results")
 
 # --- APPLY BACKGROUND IMAGE GLOBALLY ---
-try:
-    img = get_image_as_base64("background.jpg") # Make sure the image is in the same folder
-    page_bg_img = f"""
-    <style>
-    .stApp {{
-        background-image: url("data:image/jpeg;base64,{img}");
-        background-size: cover;
-        background-position: center center;
-        background-repeat: no-repeat;
-        background-attachment: fixed;
-    }}
-    </style>
-    """
+# Only a small <style> block referencing the cached static WebP/AVIF/JPEG variants
+page_bg_img = get_background_css()
+if page_bg_img:
     st.markdown(page_bg_img, unsafe_allow_html=True)
-except FileNotFoundError:
+else:
     st.warning("Background image 'background.jpg' not found.")
+_laps.mark("background")
 # --- END GLOBAL STYLES ---
 
 # --- ROUTER ---
 if not st.session_state.logged_in:
     show_login_page()
+    _laps.mark("login_page")
 else:
     show_main_app()
 
@@ -1349,17 +1426,19 @@ if st.session_state.logged_in:
     page_language = st.query_params.get("lang","English")
     uid = st.session_state['user']['uid']
     user_reminders = set(st.session_state['reminders'].get(uid, []))
-    for ev in st.session_state['events']:
-        if ev['id'] in user_reminders:
-            d_left = days_until(ev['start_date'])
-            if 0 <= d_left <= st.session_state.reminder_days:
-                st.toast(
-                    t('active_reminder_warning', page_language).format(
-                        title=ev['title'],
-                        days=d_left,
-                        date=ev['start_date'].strftime('%b %d'),
-                        venue=ev.get('venue'),
-                        city=ev.get('city')
-                    ),
-                    icon="🗓"
-                )
\ No newline at end of file
+    for ev in get_event_store().get_many(user_reminders):
+        d_left = days_until(ev['start_date'])
+        if 0 <= d_left <= st.session_state.reminder_days:
+            st.toast(
+                t('active_reminder_warning', page_language).format(
+                    title=ev['title'],
+                    days=d_left,
+                    date=ev['start_date'].strftime('%b %d'),
+                    venue=ev.get('venue'),
+                    city=ev.get('city')
+                ),
+                icon="🗓"
+            )
+
+_laps.mark("reminder_toasts")
+_laps.finish()
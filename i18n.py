@@ -0,0 +1,90 @@
+# i18n.py
+"""Precompiled UI string tables with lazily loaded extra languages.
+
+Every language is compiled once into a frozen, fallback-resolved table that
+holds every key. A missing or empty string is replaced by English, and a key
+unknown even to English by the key itself. After that, lookup is a plain dict
+access with no hashing of arguments and no per-call fallback logic. This
+matters because frontend.py calls t() hundreds of times per rerun.
+
+The built-in languages (the `translations` dict in backend.py) are compiled
+when the Catalog is created. Any other language is read from
+`locales/<Language>.json` (a flat {key: text} object, written offline by
+build_locales.py) the first time it is requested. Adding a UI language
+therefore adds neither import time nor lines to backend.py. A name that is
+neither built in nor a locale file (e.g. a stray `?lang=` value) is served the
+English table and never stored, so the catalog cannot grow with bad input.
+"""
+
+import json
+import os
+import threading
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional
+
+FALLBACK_LANGUAGE = "English"
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales")
+
+
+class Catalog:
+    """Compiled translation tables, keyed by language name (e.g. "Hindi")."""
+
+    def __init__(self, builtin: Dict[str, Dict[str, str]], required_keys: Iterable[str] = (),
+                 locales_dir: str = LOCALES_DIR, fallback: str = FALLBACK_LANGUAGE):
+        self.locales_dir = locales_dir
+        self.fallback = fallback
+        self._builtin = builtin
+        self._keys = tuple(dict.fromkeys([*builtin[fallback], *required_keys]))
+        self._lock = threading.Lock()
+        self._languages: Optional[List[str]] = None
+        base = self._compile(builtin[fallback], None)
+        tables = {fallback: base}
+        for lang, strings in builtin.items():
+            if lang != fallback:
+                tables[lang] = self._compile(strings, base)
+        # Replaced (never mutated) when a language is added, so readers need no lock
+        self._tables: Dict[str, Mapping[str, str]] = tables
+
+    def _compile(self, strings: Mapping[str, str], base: Optional[Mapping[str, str]]) -> Mapping[str, str]:
+        table = {}
+        for key in self._keys:
+            value = strings.get(key)
+            table[key] = value if isinstance(value, str) and value else (base[key] if base else key)
+        return MappingProxyType(table)
+
+    def _locale_path(self, lang: str) -> str:
+        return os.path.join(self.locales_dir, f"{lang}.json")
+
+    def _load(self, lang: str) -> Mapping[str, str]:
+        with self._lock:
+            table = self._tables.get(lang)
+            if table is not None:
+                return table
+            base = self._tables[self.fallback]
+            # Only names listed from locales/ are loaded, so query params never reach the filesystem
+            if lang not in self.languages():
+                return base
+            with open(self._locale_path(lang), encoding="utf-8") as f:
+                table = self._compile(json.load(f), base)
+            self._tables = {**self._tables, lang: table}
+            return table
+
+    def table(self, lang: str) -> Mapping[str, str]:
+        """The compiled table for `lang` (loaded on first use; English if unknown)."""
+        table = self._tables.get(lang)
+        return table if table is not None else self._load(lang)
+
+    def t(self, key: str, lang: str = FALLBACK_LANGUAGE) -> str:
+        try:
+            return self._tables[lang][key]
+        except KeyError:
+            return self.table(lang).get(key, key)
+
+    def languages(self) -> List[str]:
+        """Built-in languages first, then any locales/<Language>.json files (not loaded)."""
+        if self._languages is None:
+            extra = []
+            if os.path.isdir(self.locales_dir):
+                extra = sorted(name[:-5] for name in os.listdir(self.locales_dir) if name.endswith(".json"))
+            self._languages = list(self._builtin) + [lang for lang in extra if lang not in self._builtin]
+        return self._languages
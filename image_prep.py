@@ -0,0 +1,72 @@
+# image_prep.py
+"""Preprocess uploaded photos before sending them to Gemini.
+
+Phone photos are often 8-12 MP. Gemini scales images down and tiles them into
+768x768 tiles anyway, so sending more than a couple of tiles per edge only adds
+upload time. Each upload is:
+
+1. rotated according to its EXIF orientation (phones store it sideways),
+2. converted to RGB (alpha flattened onto white),
+3. downsized so the longest edge is at most MAX_EDGE px,
+4. re-encoded as an optimized JPEG.
+
+Work runs in a small thread pool and starts as soon as the file is uploaded
+(prefetch), so it is usually done by the time the user clicks Generate.
+"""
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+MAX_EDGE = 1536 # two 768 px Gemini tiles per edge
+JPEG_QUALITY = 85
+MIME_TYPE = "image/jpeg"
+
+_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="upload-prep")
+_MAX_PENDING = 32
+_futures: "OrderedDict[str, Future]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def preprocess(data: bytes) -> bytes:
+    """Return compact JPEG bytes for the raw uploaded image bytes."""
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+        img.thumbnail((MAX_EDGE, MAX_EDGE), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+def _submit(data: bytes) -> Future:
+    digest = hashlib.sha256(data).hexdigest()
+    with _lock:
+        fut = _futures.get(digest)
+        if fut is None:
+            fut = _futures[digest] = _POOL.submit(preprocess, data)
+            while len(_futures) > _MAX_PENDING:
+                _futures.popitem(last=False)
+        else:
+            _futures.move_to_end(digest)
+    return fut
+
+
+def prefetch(data: bytes) -> None:
+    """Start preprocessing in the background (call right after upload)."""
+    _submit(data)
+
+
+def prepared_blob(data: bytes) -> dict:
+    """Blob dict for genai content parts; waits for (or starts) preprocessing."""
+    return {"mime_type": MIME_TYPE, "data": _submit(data).result()}
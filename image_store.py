@@ -0,0 +1,122 @@
+# image_store.py
+"""Content-addressed on-disk store for generated images.
+
+Images are keyed by sha256(model version + prompt), so regenerating the same
+prompt is a cache hit. The full-size PNG is kept alongside a precomputed
+downscaled thumbnail for display; sessions only hold the short key.
+
+Layout: <root>/<key[:2]>/<key>.png and <root>/<key[:2]>/<key>_thumb.<ext>
+
+The store is bounded like kit_cache: every put() evicts images older than
+``ttl_seconds`` and then the least-recently-used ones beyond ``max_entries``.
+The PNG's mtime is the last-use time, refreshed whenever has() finds a key.
+"""
+
+import glob
+import hashlib
+import os
+import threading
+import time
+from typing import Optional
+
+from PIL import Image, features
+
+DEFAULT_IMAGE_ROOT = os.path.join(".cache", "images")
+THUMBNAIL_SIZE = 512 # longest edge in px; matches the results column width
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600 # thirty days
+
+
+def _thumb_format():
+    return ("WEBP", "webp") if features.check("webp") else ("JPEG", "jpg")
+
+
+class ImageStore:
+    def __init__(self, root: str = DEFAULT_IMAGE_ROOT, thumbnail_size: int = THUMBNAIL_SIZE,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.root = root
+        self.thumbnail_size = thumbnail_size
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._thumb_fmt, self._thumb_ext = _thumb_format()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key_for(model_name: str, prompt: str) -> str:
+        raw = f"{model_name}\n{' '.join(prompt.split())}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _dir(self, key: str) -> str:
+        return os.path.join(self.root, key[:2])
+
+    def path(self, key: str) -> str:
+        return os.path.join(self._dir(key), f"{key}.png")
+
+    def thumbnail_path(self, key: str) -> str:
+        return os.path.join(self._dir(key), f"{key}_thumb.{self._thumb_ext}")
+
+    def has(self, key: str) -> bool:
+        """True if both files exist; also marks the key as recently used."""
+        if not (os.path.exists(self.path(key)) and os.path.exists(self.thumbnail_path(key))):
+            return False
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            return False # evicted in the meantime
+        return True
+
+    def put(self, key: str, image: Image.Image) -> str:
+        """Write the full image and its thumbnail (atomically) and return the key."""
+        os.makedirs(self._dir(key), exist_ok=True)
+        thumb = image.convert("RGB")
+        thumb.thumbnail((self.thumbnail_size, self.thumbnail_size), Image.LANCZOS)
+        with self._lock:
+            for target, img, fmt, opts in (
+                (self.path(key), image, "PNG", {"optimize": True}),
+                (self.thumbnail_path(key), thumb, self._thumb_fmt, {"quality": 85}),
+            ):
+                tmp = f"{target}.tmp"
+                img.save(tmp, format=fmt, **opts)
+                os.replace(tmp, target)
+            self._evict(keep=key)
+        return key
+
+    def _remove(self, key: str) -> None:
+        for target in (self.path(key), self.thumbnail_path(key)):
+            try:
+                os.remove(target)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Drop expired images, then the least-recently-used beyond max_entries (caller holds the lock)."""
+        entries = []
+        for png in glob.glob(os.path.join(self.root, "*", "*.png")):
+            try:
+                entries.append((os.path.getmtime(png), os.path.basename(png)[:-4]))
+            except FileNotFoundError:
+                continue
+        cutoff = time.time() - self.ttl_seconds
+        live = []
+        for mtime, key in entries:
+            if mtime < cutoff and key != keep:
+                self._remove(key)
+            else:
+                live.append((mtime, key))
+        live.sort(reverse=True)
+        for _, key in live[self.max_entries:]:
+            if key != keep:
+                self._remove(key)
+
+    def __len__(self) -> int:
+        return len(glob.glob(os.path.join(self.root, "*", "*.png")))
+
+    def load(self, key: str) -> Optional[Image.Image]:
+        """Decode the full-size image (only when really needed, e.g. export)."""
+        try:
+            with Image.open(self.path(key)) as img:
+                img.load()
+                return img
+        except FileNotFoundError:
+            return None
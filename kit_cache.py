@@ -0,0 +1,117 @@
+# kit_cache.py
+"""Disk-backed response cache for AI generations.
+
+Entries live in a small SQLite file so they survive reruns, sessions and
+server restarts. The cache is bounded (least-recently-used entries are evicted
+once ``max_entries`` is exceeded) and every entry expires after ``ttl_seconds``.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_DIR = ".cache"
+DEFAULT_CACHE_PATH = os.path.join(DEFAULT_CACHE_DIR, "kit_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600 # one week
+
+PROMPT_FIELD_KEYS = ("title", "materials", "region", "tone", "description")
+
+
+def normalize_prompt_fields(prompt_fields: Dict[str, Any]) -> Dict[str, str]:
+    """Return the prompt fields in a canonical form for cache keys.
+
+    Whitespace is collapsed and case is folded so that "Terracotta  Diya" and
+    "terracotta diya" hit the same entry. Unknown keys are ignored.
+    """
+    out = {}
+    for k in PROMPT_FIELD_KEYS:
+        v = prompt_fields.get(k) or ""
+        out[k] = " ".join(str(v).split()).casefold()
+    return out
+
+
+def make_key(*parts: Any) -> str:
+    """Build a stable content-addressed key (sha256) from JSON-serialisable parts."""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe SQLite cache with LRU size limit and TTL expiry."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serialisable value and evict the oldest entries if over capacity."""
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now),
+            )
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                """DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
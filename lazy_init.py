@@ -0,0 +1,85 @@
+# lazy_init.py
+"""Thread-safe lazy initialization of SDK clients, with a startup-time breakdown.
+
+Importing and configuring the Gemini SDK, the Vertex AI vision SDK and
+pyrebase takes seconds. Doing it at import time made every cold start and
+worker spawn pay for all three, even for sessions that never call them. Each
+client is now wrapped in a Lazy that builds it on first use. The first caller
+builds it under a lock, concurrent callers wait for that result, and a failed
+build is retried by the next caller.
+
+Every build, and any stage wrapped in timed(), is recorded. report() returns
+the breakdown. With STARTUP_REPORT=1 each stage is also printed to stderr as
+it completes.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Generic, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_timings: "OrderedDict[str, float]" = OrderedDict() # stage -> seconds
+_timings_lock = threading.Lock()
+
+
+def record(stage: str, seconds: float) -> None:
+    """Add a completed stage to the breakdown (repeated stages accumulate)."""
+    with _timings_lock:
+        _timings[stage] = _timings.get(stage, 0.0) + seconds
+    if os.environ.get("STARTUP_REPORT"):
+        print(f"[startup] {stage}: {seconds * 1000:.1f} ms", file=sys.stderr)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started)
+
+
+def report() -> Dict[str, float]:
+    """Startup breakdown so far, in milliseconds, in the order stages completed."""
+    with _timings_lock:
+        return {stage: round(seconds * 1000, 1) for stage, seconds in _timings.items()}
+
+
+def format_report() -> str:
+    rows = report()
+    if not rows:
+        return "no startup stages recorded"
+    width = max(len(stage) for stage in rows)
+    lines = [f"{stage.ljust(width)}  {ms:9.1f} ms" for stage, ms in rows.items()]
+    lines.append(f"{'total'.ljust(width)}  {sum(rows.values()):9.1f} ms")
+    return "\n".join(lines)
+
+
+class Lazy(Generic[T]):
+    """A value built by `factory` on first get(); thread-safe, failures are not cached."""
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._ready = False
+        self._value: T = None # type: ignore[assignment]
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def get(self) -> T:
+        if self._ready:
+            return self._value
+        with self._lock:
+            if not self._ready:
+                with timed(self.name):
+                    self._value = self._factory()
+                self._ready = True
+        return self._value
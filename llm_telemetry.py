@@ -0,0 +1,321 @@
+# llm_telemetry.py
+"""Per-call telemetry for Gemini and Imagen generations.
+
+Each generator call in backend.py is wrapped in a CallRecord. The record
+captures:
+- the generator name and content language;
+- wall-clock latency;
+- prompt/output token counts from the response's usage_metadata;
+- the number of retries;
+- the outcome and error class;
+- whether the response cache was hit;
+- whether this call made the upstream request itself, or shared a coalesced
+  request (single_flight) or a cached result.
+
+Records are buffered in memory and written in batches to a small SQLite file
+(`.cache/llm_calls.sqlite3`). The file is rolling: rows older than
+`max_age_seconds`, and the oldest rows beyond `max_rows`, are dropped on
+each flush. summary() aggregates the rows per generator and language. Run
+`python llm_telemetry.py` to print that summary as a table.
+"""
+
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import rate_limiter
+
+DEFAULT_TELEMETRY_PATH = os.path.join(".cache", "llm_calls.sqlite3")
+DEFAULT_MAX_ROWS = 50_000
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 3600 # thirty days
+FLUSH_INTERVAL_SECONDS = 5.0
+FLUSH_BATCH_SIZE = 64
+
+_FIELDS = ("ts", "generator", "language", "model", "latency_ms", "outcome", "error_class", "error_type",
+           "cache", "upstream", "retries", "prompt_tokens", "output_tokens", "total_tokens")
+
+
+def classify_error(error: Any) -> str:
+    """Coarse error class for grouping: timeout, cancelled, rate_limited, transient or error.
+
+    A string (e.g. "invalid_response") is a failure without an exception and is
+    returned unchanged.
+    """
+    if isinstance(error, str):
+        return error
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)) or type(error).__name__ == "DeadlineExceeded":
+        return "timeout"
+    if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+        return "cancelled"
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests") or rate_limiter.status_code(error) == 429:
+        return "rate_limited"
+    if isinstance(error, Exception) and rate_limiter.is_transient(error):
+        return "transient"
+    return "error"
+
+
+class CallRecord:
+    """Telemetry for one generator call; use as a context manager around the call.
+
+    Exceptions escaping the block are recorded and re-raised. Callers that
+    handle errors themselves report them with fail().
+    """
+
+    def __init__(self, generator: str, language: Optional[str], model: str,
+                 store: Optional["TelemetryStore"] = None):
+        self.generator = generator
+        self.language = language
+        self.model = model
+        self.store = store
+        self.cache: Optional[str] = None # "hit" / "miss"; None when no cache was consulted
+        self.upstream = False
+        self.retries = 0
+        self.prompt_tokens: Optional[int] = None
+        self.output_tokens: Optional[int] = None
+        self.total_tokens: Optional[int] = None
+        self.error_class: Optional[str] = None
+        self.error_type: Optional[str] = None
+        self.started = time.perf_counter()
+
+    def cache_hit(self) -> None:
+        self.cache = "hit"
+
+    def cache_miss(self) -> None:
+        self.cache = "miss"
+
+    def on_retry(self, attempt: int, exc: BaseException) -> None:
+        """rate_limiter.call_with_retry(on_retry=...) hook."""
+        self.retries = attempt
+
+    def record_response(self, response: Any) -> None:
+        """Mark that this call made the upstream request and read its usage_metadata, if any."""
+        self.upstream = True
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        self.prompt_tokens = getattr(usage, "prompt_token_count", None)
+        self.output_tokens = getattr(usage, "candidates_token_count", None)
+        self.total_tokens = getattr(usage, "total_token_count", None)
+
+    def fail(self, error: Any) -> None:
+        """Record a failure: an exception, or a reason string such as "invalid_response"."""
+        self.error_class = classify_error(error)
+        self.error_type = error if isinstance(error, str) else type(error).__name__
+
+    def __enter__(self) -> "CallRecord":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc is not None and self.error_class is None:
+            self.fail(exc)
+        if self.store is not None:
+            self.store.record(self.row())
+        return False
+
+    def row(self) -> Dict[str, Any]:
+        return {
+            "ts": time.time(), "generator": self.generator, "language": self.language, "model": self.model,
+            "latency_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "outcome": "ok" if self.error_class is None else "error",
+            "error_class": self.error_class, "error_type": self.error_type,
+            "cache": self.cache, "upstream": int(self.upstream), "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens, "output_tokens": self.output_tokens,
+            "total_tokens": self.total_tokens,
+        }
+
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class TelemetryStore:
+    """Thread-safe rolling SQLite log of CallRecord rows, written in batches."""
+
+    def __init__(self, path: str = DEFAULT_TELEMETRY_PATH, max_rows: int = DEFAULT_MAX_ROWS,
+                 max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS):
+        self.path = path
+        self.max_rows = max_rows
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock() # guards the connection
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                generator TEXT NOT NULL,
+                language TEXT,
+                model TEXT,
+                latency_ms REAL NOT NULL,
+                outcome TEXT NOT NULL,
+                error_class TEXT,
+                error_type TEXT,
+                cache TEXT,
+                upstream INTEGER NOT NULL,
+                retries INTEGER NOT NULL,
+                prompt_tokens INTEGER,
+                output_tokens INTEGER,
+                total_tokens INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_calls_ts ON calls(ts);
+            """
+        )
+        self._conn.commit()
+        atexit.register(self.flush)
+
+    def record(self, row: Dict[str, Any]) -> None:
+        """Queue a row; it is written by the next batch flush (at most FLUSH_INTERVAL_SECONDS later)."""
+        with self._pending_lock:
+            self._pending.append(row)
+            full = len(self._pending) >= FLUSH_BATCH_SIZE
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="llm-telemetry", daemon=True)
+                self._flusher.start()
+        if full:
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass # kept queued for the background flush
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(FLUSH_INTERVAL_SECONDS)
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass # telemetry must never take the app down; rows are retried next round
+
+    def flush(self) -> None:
+        """Write queued rows and apply the age/row-count retention."""
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    f"INSERT INTO calls ({', '.join(_FIELDS)}) VALUES ({', '.join('?' * len(_FIELDS))})",
+                    [tuple(r[f] for f in _FIELDS) for r in rows],
+                )
+                self._conn.execute("DELETE FROM calls WHERE ts < ?", (time.time() - self.max_age_seconds,))
+                self._conn.execute(
+                    "DELETE FROM calls WHERE id IN (SELECT id FROM calls ORDER BY id DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,),
+                )
+        except sqlite3.Error:
+            with self._pending_lock:
+                self._pending[:0] = rows
+            raise
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """The most recent rows, newest first."""
+        self.flush()
+        with self._lock:
+            cur = self._conn.execute(f"SELECT {', '.join(_FIELDS)} FROM calls ORDER BY id DESC LIMIT ?", (limit,))
+            return [dict(zip(_FIELDS, r)) for r in cur]
+
+    def summary(self, since_seconds: Optional[float] = None,
+                group_by: Sequence[str] = ("generator", "language")) -> List[Dict[str, Any]]:
+        """Aggregate rows per group (default: generator x language).
+
+        Each group reports calls, upstream (API) calls, cache hit rate, errors
+        by class, retries, latency percentiles (ms) and token totals. Tokens
+        count only upstream calls that reported usage; coalesced and cached
+        calls spend no quota.
+        """
+        self.flush()
+        where, params = "", []
+        if since_seconds is not None:
+            where, params = " WHERE ts >= ?", [time.time() - since_seconds]
+        with self._lock:
+            rows = [dict(zip(_FIELDS, r)) for r in self._conn.execute(
+                f"SELECT {', '.join(_FIELDS)} FROM calls{where} ORDER BY latency_ms", params
+            )]
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for r in rows:
+            groups.setdefault(tuple(r[g] for g in group_by), []).append(r)
+        out = []
+        for key, items in sorted(groups.items(), key=lambda kv: tuple(str(k) for k in kv[0])):
+            latencies = [r["latency_ms"] for r in items] # already sorted
+            upstream = [r for r in items if r["upstream"]]
+            hits = sum(1 for r in items if r["cache"] == "hit")
+            looked_up = sum(1 for r in items if r["cache"] in ("hit", "miss"))
+            errors: Dict[str, int] = {}
+            for r in items:
+                if r["error_class"]:
+                    errors[r["error_class"]] = errors.get(r["error_class"], 0) + 1
+            metered = [r for r in upstream if r["total_tokens"] is not None]
+            prompt_tokens = sum(r["prompt_tokens"] or 0 for r in metered)
+            output_tokens = sum(r["output_tokens"] or 0 for r in metered)
+            total_tokens = sum(r["total_tokens"] for r in metered)
+            out.append({
+                **dict(zip(group_by, key)),
+                "calls": len(items),
+                "upstream_calls": len(upstream),
+                "cache_hit_rate": round(hits / looked_up, 3) if looked_up else None,
+                "errors": errors,
+                "retries": sum(r["retries"] for r in items),
+                "p50_ms": _percentile(latencies, 0.50),
+                "p95_ms": _percentile(latencies, 0.95),
+                "max_ms": latencies[-1] if latencies else None,
+                "prompt_tokens": prompt_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": total_tokens,
+                "avg_total_tokens": round(total_tokens / len(metered), 1) if metered else None,
+            })
+        return out
+
+
+def format_summary(rows: List[Dict[str, Any]]) -> str:
+    """Render summary() rows as a plain-text table."""
+    if not rows:
+        return "no LLM calls recorded"
+    columns = [c for c in rows[0] if c != "errors"] + ["errors"]
+    def cell(row, col):
+        v = row.get(col)
+        if col == "errors":
+            return ",".join(f"{k}:{n}" for k, n in sorted(v.items())) or "-"
+        return "-" if v is None else str(v)
+    table = [columns] + [[cell(r, c) for c in columns] for r in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(columns))]
+    return "\n".join("  ".join(v.ljust(w) for v, w in zip(line, widths)).rstrip() for line in table)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Summarise recorded Gemini/Imagen call telemetry.")
+    parser.add_argument("--path", default=DEFAULT_TELEMETRY_PATH, help="telemetry SQLite file")
+    parser.add_argument("--since-hours", type=float, default=None, help="only include calls from the last N hours")
+    parser.add_argument("--by", default="generator,language",
+                        help="comma-separated grouping columns (e.g. generator or generator,language,model)")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.path):
+        parser.error(f"{args.path} does not exist (no calls recorded yet?)")
+    group_by = [c.strip() for c in args.by.split(",") if c.strip()]
+    unknown = [c for c in group_by if c not in _FIELDS]
+    if unknown:
+        parser.error(f"unknown grouping column(s): {', '.join(unknown)}")
+    store = TelemetryStore(args.path)
+    since = args.since_hours * 3600 if args.since_hours is not None else None
+    rows = store.summary(since, group_by)
+    print(json.dumps(rows, indent=2, ensure_ascii=False) if args.json else format_summary(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
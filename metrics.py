@@ -0,0 +1,269 @@
+# metrics.py
+"""In-process timing histograms with Prometheus text and JSON export.
+
+Hot paths are instrumented with:
+- timer(name, **labels): a context manager;
+- timed(name, **labels): a decorator that handles plain, generator and
+  async functions;
+- laps(name): sequential section timings through a linear script such as
+  frontend.py.
+
+Observations are aggregated into cumulative histograms in this process.
+
+Metrics are off by default. While disabled, timer() returns a shared no-op
+object and timed() wrappers do a single flag check before calling through,
+so the instrumentation costs next to nothing.
+
+Enable with configure(enabled=True). backend.start_metrics() does this from
+METRICS_* env vars or the [metrics] secrets table. Export options:
+- prometheus_text() and snapshot() return the data;
+- start_http_server(port) serves /metrics (Prometheus) and /metrics.json;
+- start_json_dump(path, interval) rewrites a JSON file periodically.
+"""
+
+import bisect
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Seconds; covers cheap reruns (ms) up to slow model calls (tens of seconds)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_enabled = False
+_registry: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], "Histogram"] = {}
+_help: Dict[str, str] = {}
+_registry_lock = threading.Lock()
+
+
+class Histogram:
+    """Cumulative histogram of observations (seconds) for one name + label set."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def state(self) -> Dict[str, Any]:
+        with self._lock:
+            counts, total, n = list(self.counts), self.sum, self.count
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return {"buckets": dict(zip([*map(str, self.buckets), "+Inf"], cumulative)),
+                "sum": total, "count": n}
+
+
+def configure(enabled: bool = True) -> None:
+    global _enabled
+    _enabled = enabled
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def describe(name: str, help_text: str) -> None:
+    """Set the HELP line shown for a metric in the Prometheus output."""
+    _help[name] = help_text
+
+
+def observe(name: str, seconds: float, **labels: Any) -> None:
+    if not _enabled:
+        return
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    hist = _registry.get(key)
+    if hist is None:
+        with _registry_lock:
+            hist = _registry.setdefault(key, Histogram())
+    hist.observe(seconds)
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "started")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class _NoOp:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def mark(self, section: str) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+
+_NOOP = _NoOp()
+
+
+def timer(name: str, **labels: Any):
+    """Context manager timing its block into histogram `name` (a shared no-op when disabled)."""
+    return _Timer(name, labels) if _enabled else _NOOP
+
+
+def timed(name: str, **labels: Any) -> Callable:
+    """Decorator timing each call; generators are timed until exhausted, coroutines until done."""
+    def decorate(fn):
+        if inspect.isasyncgenfunction(fn):
+            return fn # not used in this app; left untimed
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await fn(*args, **kwargs)
+                with _Timer(name, labels):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return (yield from fn(*args, **kwargs))
+                with _Timer(name, labels):
+                    return (yield from fn(*args, **kwargs))
+            return gen_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Timer(name, labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class _Laps:
+    def __init__(self, name: str, total_name: Optional[str]):
+        self.name = name
+        self.total_name = total_name
+        self.started = self.last = time.perf_counter()
+
+    def mark(self, section: str) -> None:
+        """Record the time since the previous mark (or start) as `section`."""
+        now = time.perf_counter()
+        observe(self.name, now - self.last, section=section)
+        self.last = now
+
+    def finish(self) -> None:
+        if self.total_name:
+            observe(self.total_name, time.perf_counter() - self.started)
+
+
+def laps(name: str, total_name: Optional[str] = None):
+    """Sequential section timer: call .mark(section) at the end of each section, .finish() at the end."""
+    return _Laps(name, total_name) if _enabled else _NOOP
+
+
+def snapshot() -> Dict[str, Any]:
+    """All histograms as a JSON-serialisable dict: {name: [{labels, buckets, sum, count}]}."""
+    with _registry_lock:
+        items = list(_registry.items())
+    out: Dict[str, Any] = {}
+    for (name, labels), hist in sorted(items, key=lambda kv: kv[0]):
+        out.setdefault(name, []).append({"labels": dict(labels), **hist.state()})
+    return {"timestamp": time.time(), "metrics": out}
+
+
+def _label_str(labels: Dict[str, str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels.items()) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def prometheus_text() -> str:
+    """Histograms in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, series in snapshot()["metrics"].items():
+        lines.append(f"# HELP {name} {_help.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for s in series:
+            for le, count in s["buckets"].items():
+                lines.append(f"{name}_bucket{_label_str(s['labels'], ('le', le))} {count}")
+            lines.append(f"{name}_sum{_label_str(s['labels'])} {s['sum']:.6f}")
+            lines.append(f"{name}_count{_label_str(s['labels'])} {s['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] == "/metrics":
+            body, ctype = prometheus_text().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path.split("?")[0] == "/metrics.json":
+            body, ctype = json.dumps(snapshot()).encode("utf-8"), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args): # keep scrapes out of the app's stderr
+        pass
+
+
+def start_http_server(port: int, addr: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics and /metrics.json from a daemon thread."""
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def write_json(path: str) -> None:
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f)
+    os.replace(tmp, path)
+
+
+def start_json_dump(path: str, interval_seconds: float = 60.0) -> threading.Thread:
+    """Rewrite `path` with snapshot() every interval (atomically), from a daemon thread."""
+    def loop():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                write_json(path)
+            except OSError:
+                pass
+    thread = threading.Thread(target=loop, name="metrics-json-dump", daemon=True)
+    thread.start()
+    return thread
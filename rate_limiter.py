@@ -0,0 +1,194 @@
+# rate_limiter.py
+"""Process-wide rate limiting and retry for Gemini / Imagen calls.
+
+Every Streamlit session runs in the same server process, so a module-level
+registry of token buckets keeps the *combined* request rate inside quota.
+Callers that exceed the rate are queued (they sleep until their slot comes up)
+instead of failing, and transient errors (429 / quota, 5xx, deadline) are
+retried with exponential backoff and full jitter. Errors are classified by
+exception type or HTTP status code, never by message text. An optional
+overall deadline bounds the retries, so a slow upstream costs one timeout
+rather than one per attempt.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Requests per minute and burst size per model. Override with configure().
+DEFAULT_LIMITS: Dict[str, Dict[str, float]] = {
+    "gemini-2.5-flash": {"rpm": 60, "burst": 10},
+    "imagegeneration@006": {"rpm": 10, "burst": 2},
+}
+FALLBACK_LIMIT = {"rpm": 30, "burst": 5}
+
+MAX_ATTEMPTS = 5
+BASE_DELAY_SECONDS = 1.0
+MAX_DELAY_SECONDS = 30.0
+
+TRANSIENT_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def _model_key(model_name: str) -> str:
+    return model_name.split("/")[-1]
+
+
+class TokenBucket:
+    """Token bucket where callers reserve a slot and wait for it (FIFO-ish queueing)."""
+
+    def __init__(self, rpm: float, burst: float):
+        self.rate = rpm / 60.0
+        self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take one token (possibly going into debt) and return how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """Block until a request slot is available; returns the time spent queued."""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+_limits: Dict[str, Dict[str, float]] = {k: dict(v) for k, v in DEFAULT_LIMITS.items()}
+_buckets: Dict[str, TokenBucket] = {}
+_registry_lock = threading.Lock()
+
+
+def configure(limits: Dict[str, Dict[str, float]]) -> None:
+    """Override per-model limits, e.g. {"gemini-2.5-flash": {"rpm": 120, "burst": 20}}."""
+    with _registry_lock:
+        for name, cfg in limits.items():
+            key = _model_key(name)
+            merged = dict(_limits.get(key, FALLBACK_LIMIT))
+            merged.update({k: float(v) for k, v in dict(cfg).items() if k in ("rpm", "burst")})
+            _limits[key] = merged
+            _buckets.pop(key, None)
+
+
+def get_limiter(model_name: str) -> TokenBucket:
+    """Return the shared bucket for a model, creating it on first use."""
+    key = _model_key(model_name)
+    with _registry_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            cfg = _limits.get(key, FALLBACK_LIMIT)
+            bucket = _buckets[key] = TokenBucket(cfg["rpm"], cfg["burst"])
+        return bucket
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """HTTP status carried by an exception (api_core `.code`, `.status_code`, or a
+    requests-style `.response.status_code`), or None."""
+    for value in (getattr(exc, "code", None), getattr(exc, "status_code", None),
+                  getattr(getattr(exc, "response", None), "status_code", None)):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return int(value)
+    return None
+
+
+def is_transient(exc: BaseException) -> bool:
+    """True for errors worth retrying: quota/429, server-side 5xx and timeouts."""
+    try:
+        from google.api_core import exceptions as gexc
+        if isinstance(exc, (gexc.TooManyRequests, gexc.ResourceExhausted, gexc.ServiceUnavailable,
+                            gexc.InternalServerError, gexc.DeadlineExceeded, gexc.Aborted)):
+            return True
+    except ImportError:
+        pass
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    return status_code(exc) in TRANSIENT_STATUS_CODES
+
+
+def backoff_delay(attempt: int, base: float = BASE_DELAY_SECONDS, cap: float = MAX_DELAY_SECONDS) -> float:
+    """Exponential backoff with full jitter for the given (0-based) retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _retry_delay(attempt: int, error: BaseException, max_attempts: int,
+                 deadline_at: Optional[float]) -> Optional[float]:
+    """Seconds to sleep before the next attempt, or None to give up and re-raise."""
+    if attempt >= max_attempts or not is_transient(error):
+        return None
+    delay = backoff_delay(attempt - 1)
+    if deadline_at is not None and time.monotonic() + delay >= deadline_at:
+        return None
+    return delay
+
+
+def _attempt_kwargs(kwargs: Dict[str, Any], deadline_at: Optional[float]) -> Dict[str, Any]:
+    """Shorten a request_options={"timeout": ...} keyword to the time left before the deadline."""
+    options = kwargs.get("request_options")
+    if deadline_at is None or not isinstance(options, dict) or options.get("timeout") is None:
+        return kwargs
+    remaining = max(0.0, deadline_at - time.monotonic())
+    return {**kwargs, "request_options": {**options, "timeout": min(options["timeout"], remaining)}}
+
+
+def call_with_retry(model_name: str, fn: Callable[..., Any], *args,
+                    max_attempts: int = MAX_ATTEMPTS,
+                    on_retry: Optional[Callable[[int, BaseException], None]] = None,
+                    deadline: Optional[float] = None, **kwargs) -> Any:
+    """Rate-limit and call fn, retrying transient failures with backoff + jitter.
+
+    `deadline` (seconds) bounds all attempts together. No retry starts once it
+    has passed, and a request_options timeout is cut to the time left.
+    """
+    bucket = get_limiter(model_name)
+    deadline_at = None if deadline is None else time.monotonic() + deadline
+    attempt = 0
+    while True:
+        bucket.acquire()
+        try:
+            return fn(*args, **_attempt_kwargs(kwargs, deadline_at))
+        except Exception as e:
+            attempt += 1
+            delay = _retry_delay(attempt, e, max_attempts, deadline_at)
+            if delay is None:
+                raise
+            if on_retry:
+                on_retry(attempt, e)
+            time.sleep(delay)
+
+
+async def call_with_retry_async(model_name: str, coro_fn: Callable[..., Any], *args,
+                                max_attempts: int = MAX_ATTEMPTS,
+                                on_retry: Optional[Callable[[int, BaseException], None]] = None,
+                                deadline: Optional[float] = None, **kwargs) -> Any:
+    """Async variant of call_with_retry; coro_fn is called anew for every attempt."""
+    bucket = get_limiter(model_name)
+    deadline_at = None if deadline is None else time.monotonic() + deadline
+    attempt = 0
+    while True:
+        await bucket.acquire_async()
+        try:
+            return await coro_fn(*args, **_attempt_kwargs(kwargs, deadline_at))
+        except Exception as e:
+            attempt += 1
+            delay = _retry_delay(attempt, e, max_attempts, deadline_at)
+            if delay is None:
+                raise
+            if on_retry:
+                on_retry(attempt, e)
+            await asyncio.sleep(delay)
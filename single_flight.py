@@ -0,0 +1,155 @@
+# single_flight.py
+"""Coalesce identical in-flight requests into one upstream call.
+
+When several sessions ask for the same thing at the same time (e.g. the same
+market-trend query), only the first caller — the leader — hits the API. The
+others wait and receive the leader's result, or its exception. Nothing is
+kept once the call finishes; persistent caching lives in kit_cache.py.
+
+Functions passed in should raise on failure instead of reporting through
+Streamlit, so that every waiting session can surface the error itself.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+def make_key(*parts: Any) -> str:
+    """Key from normalized parts: strings are whitespace-collapsed and case-folded."""
+    def norm(v):
+        if isinstance(v, str):
+            return " ".join(v.split()).casefold()
+        if isinstance(v, (list, tuple)):
+            return [norm(x) for x in v]
+        if isinstance(v, dict):
+            return {k: norm(x) for k, x in v.items()}
+        return v
+    raw = json.dumps([norm(p) for p in parts], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _StreamCall:
+    """Buffered broadcast of one upstream stream to any number of readers."""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.cond = threading.Condition()
+
+    def pump(self, gen: Iterator[Any]) -> None:
+        try:
+            for chunk in gen:
+                with self.cond:
+                    self.chunks.append(chunk)
+                    self.cond.notify_all()
+        except BaseException as e:
+            self.error = e
+        finally:
+            with self.cond:
+                self.finished = True
+                self.cond.notify_all()
+
+    def read(self) -> Iterator[Any]:
+        i = 0
+        while True:
+            with self.cond:
+                while i >= len(self.chunks) and not self.finished:
+                    self.cond.wait()
+                pending = self.chunks[i:]
+                finished = self.finished
+            for chunk in pending:
+                yield chunk
+            i += len(pending)
+            if finished and i >= len(self.chunks):
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _StreamCall] = {}
+        self._async_calls: Dict[Any, list] = {}
+
+    def do(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn once per key among concurrent callers and share the outcome."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stream(self, key: str, gen_fn: Callable[..., Iterator[Any]], *args, **kwargs) -> Iterator[Any]:
+        """Share one upstream stream among concurrent callers.
+
+        The upstream generator is drained by a background thread, so a reader
+        that stops early (e.g. its session navigated away) does not stall the
+        others. Late joiners replay the chunks received so far.
+        """
+        with self._lock:
+            call = self._streams.get(key)
+            if call is None:
+                call = self._streams[key] = _StreamCall()
+
+                def run():
+                    try:
+                        call.pump(gen_fn(*args, **kwargs))
+                    finally:
+                        with self._lock:
+                            if self._streams.get(key) is call:
+                                del self._streams[key]
+
+                threading.Thread(target=run, name="single-flight-stream", daemon=True).start()
+        return call.read()
+
+    async def do_async(self, key: str, coro_fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Async variant of do(); coalesces callers running on the same event loop.
+
+        A waiter that is cancelled (or hits its deadline) leaves the shared call
+        running for the others; the upstream task is cancelled only once no
+        waiters remain.
+        """
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        entry = self._async_calls.get(slot)
+        if entry is None:
+            task = loop.create_task(coro_fn(*args, **kwargs))
+            entry = self._async_calls[slot] = [task, 0]
+            task.add_done_callback(
+                lambda _t: self._async_calls.pop(slot, None) if self._async_calls.get(slot) is entry else None
+            )
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not task.done():
+                task.cancel()
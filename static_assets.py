@@ -0,0 +1,111 @@
+# static_assets.py
+"""Build the app's images once at startup and serve them as static files.
+
+Inlining background.jpg as base64 costs ~2 MB of markup on every rerun. Instead,
+the images are written into ./static (served by Streamlit at app/static/ when
+server.enableStaticServing is on). The browser fetches them once and caches
+them. Responsive WebP and AVIF variants of the background are pre-generated
+with Pillow. File names carry a content hash, so a changed source image gets
+a new URL.
+"""
+
+import hashlib
+import os
+import shutil
+from typing import Dict, List, Optional
+
+from PIL import Image, features
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+STATIC_URL = "app/static"
+
+BACKGROUND_SOURCE = "background.jpg"
+LOGO_SOURCE = "logo.gif"
+BACKGROUND_WIDTHS = (1280, 1920, 2560)
+ENCODERS = (
+    # (format, extension, mime, save options)
+    ("AVIF", "avif", "image/avif", {"quality": 60}),
+    ("WEBP", "webp", "image/webp", {"quality": 80, "method": 6}),
+    ("JPEG", "jpg", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+)
+
+
+def _source(name: str) -> Optional[str]:
+    path = os.path.join(BASE_DIR, name)
+    return path if os.path.exists(path) else None
+
+
+def _digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:10]
+
+
+def _available_encoders():
+    return [e for e in ENCODERS if e[0] == "JPEG" or features.check(e[1])]
+
+
+def _build_background(src: str) -> List[Dict[str, object]]:
+    """Write background variants; returns [{width, mime, url}] sorted by width."""
+    digest = _digest(src)
+    variants = []
+    with Image.open(src) as img:
+        img = img.convert("RGB")
+        widths = sorted({min(w, img.width) for w in BACKGROUND_WIDTHS})
+        for width in widths:
+            resized = None
+            for fmt, ext, mime, opts in _available_encoders():
+                name = f"background-{digest}-{width}.{ext}"
+                target = os.path.join(STATIC_DIR, name)
+                if not os.path.exists(target):
+                    if resized is None:
+                        height = round(img.height * width / img.width)
+                        resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+                    tmp = f"{target}.tmp"
+                    resized.save(tmp, format=fmt, **opts)
+                    os.replace(tmp, target)
+                variants.append({"width": width, "mime": mime, "url": f"{STATIC_URL}/{name}"})
+    return variants
+
+
+def _build_logo(src: str) -> str:
+    name = f"logo-{_digest(src)}.gif"
+    target = os.path.join(STATIC_DIR, name)
+    if not os.path.exists(target):
+        shutil.copyfile(src, target)
+    return f"{STATIC_URL}/{name}"
+
+
+def build_static_assets() -> Dict[str, object]:
+    """Generate/copy static assets (idempotent) and return their URLs.
+
+    Returns {"background": [variants] or None, "logo": url or None}.
+    """
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    bg = _source(BACKGROUND_SOURCE)
+    logo = _source(LOGO_SOURCE)
+    return {
+        "background": _build_background(bg) if bg else None,
+        "logo": _build_logo(logo) if logo else None,
+    }
+
+
+def background_css(variants: List[Dict[str, object]]) -> str:
+    """CSS for .stApp using image-set() per viewport width (a few hundred bytes)."""
+    by_width: Dict[int, List[Dict[str, object]]] = {}
+    for v in variants:
+        by_width.setdefault(v["width"], []).append(v)
+    widths = sorted(by_width)
+
+    def rule(width):
+        options = by_width[width]
+        fallback = next(v for v in options if v["mime"] == "image/jpeg")
+        image_set = ", ".join(f'url("{v["url"]}") type("{v["mime"]}")' for v in options)
+        return (f'background-image: url("{fallback["url"]}"); '
+                f'background-image: image-set({image_set});')
+
+    css = [".stApp { %s background-size: cover; background-position: center center; "
+           "background-repeat: no-repeat; background-attachment: fixed; }" % rule(widths[0])]
+    for lower, width in zip(widths, widths[1:]):
+        css.append("@media (min-width: %dpx) { .stApp { %s } }" % (lower + 1, rule(width)))
+    return "<style>\n" + "\n".join(css) + "\n</style>"
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+import batch_kits
+
+KIT = {"story": "s", "instagram_post": {"caption": "c", "hashtags": ""},
+       "twitter_post": {"text": "t"}, "facebook_post": {"caption": "c", "hashtags": ""}}
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_csv_rows_get_sanitised_sku_ids_and_untitled_rows_are_skipped(tmp_path):
+    path = write(tmp_path, "cat.csv", "SKU,Title,Region\nA/1, Blue Vase ,Jaipur\nA 2,,Khurja\n")
+    rows = batch_kits.read_catalog(path)
+    assert [(r["row_id"], r["title"]) for r in rows] == [("A_1", "Blue Vase")]
+
+
+def test_fallback_ids_hash_the_fields_not_the_position(tmp_path):
+    first = batch_kits.read_catalog(write(tmp_path, "a.jsonl", '{"title": "Vase"}\n{"title": "Lamp"}\n'))
+    second = batch_kits.read_catalog(write(tmp_path, "b.jsonl", '{"title": "Diya"}\n{"title": "Lamp"}\n'))
+    assert first[1]["row_id"] == second[1]["row_id"]
+    assert first[1]["row_id"].startswith("row-")
+    assert first[0]["row_id"] != second[0]["row_id"]
+
+
+def test_exact_duplicate_rows_are_processed_once(tmp_path):
+    rows = batch_kits.read_catalog(write(tmp_path, "c.jsonl", '{"title": "Lamp"}\n{"title": "Lamp"}\n'))
+    assert len(rows) == 1
+
+
+@pytest.mark.parametrize("catalog", [
+    '{"sku": "A1", "title": "Vase"}\n{"sku": "A1", "title": "Lamp"}\n',
+    '{"sku": "A/1", "title": "Vase"}\n{"sku": "A 1", "title": "Lamp"}\n', # equal once sanitised
+])
+def test_different_rows_with_the_same_id_are_rejected(tmp_path, catalog):
+    with pytest.raises(ValueError, match="duplicate row ids"):
+        batch_kits.read_catalog(write(tmp_path, "d.jsonl", catalog))
+
+
+def test_rerun_resumes_only_unfinished_rows(tmp_path, monkeypatch):
+    calls = []
+
+    def get_ai_content(fields, language):
+        calls.append(fields["title"])
+        return None if fields["title"] == "Lamp" and len(calls) == 2 else KIT
+
+    monkeypatch.setattr(batch_kits.backend, "get_ai_content", get_ai_content)
+    rows = batch_kits.read_catalog(write(tmp_path, "e.jsonl", '{"title": "Vase"}\n{"title": "Lamp"}\n'))
+    out = str(tmp_path / "out")
+    runner = batch_kits.BatchRunner(out, with_images=False, workers=1)
+    runner.text_gate.base_delay = runner.text_gate._delay = 0.0
+    assert runner.run(rows) == {"total": 2, "already_done": 0, "ok": 1, "failed": 1}
+    assert batch_kits.BatchRunner(out, with_images=False, workers=1).run(rows) == {
+        "total": 2, "already_done": 1, "ok": 1, "failed": 0}
+    assert calls == ["Vase", "Lamp", "Lamp"]
+    saved = json.loads((tmp_path / "out" / f"{rows[1]['row_id']}.json").read_text(encoding="utf-8"))
+    assert saved["kit"] == KIT and saved["language"] == "English"
+    progress = (tmp_path / "out" / "progress.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(progress) == 3
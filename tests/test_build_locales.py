@@ -0,0 +1,56 @@
+import json
+
+import build_locales
+from build_locales import TranslationCache, placeholders
+
+
+def test_placeholders():
+    assert placeholders("Starts in {days} ({title})") == {"days", "title"}
+    assert placeholders("No fields, {{literal}} braces") == set()
+    assert placeholders("Broken {field") == {"<malformed>"}
+
+
+def test_translation_cache_keeps_the_latest_text_per_key(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite3"))
+    cache.put_many("Tamil", [("save", "h1", "old"), ("title", "h2", "Title")])
+    cache.put_many("Tamil", [("save", "h3", "new")])
+    cache.put_many("Bengali", [("save", "h1", "other")])
+    assert cache.lookup("Tamil") == {"save": ("h3", "new"), "title": ("h2", "Title")}
+    assert TranslationCache(cache.path).lookup("Bengali") == {"save": ("h1", "other")}
+
+
+def test_build_translates_only_new_or_changed_strings(tmp_path, monkeypatch):
+    sources = {"greet": "Hello {name}", "save": "Save", "bye": "Bye"}
+    sent = []
+
+    def translate(batch, language):
+        sent.append(sorted(batch))
+        # Dropping a placeholder gets the key rejected
+        return {k: ("Vanakkam" if k == "greet" else f"{language}:{v}") for k, v in batch.items()}
+
+    monkeypatch.setattr(build_locales, "source_strings", lambda: dict(sources))
+    monkeypatch.setattr(build_locales.backend, "translate_ui_strings", translate)
+    out, cache = str(tmp_path / "locales"), str(tmp_path / "cache.sqlite3")
+
+    [stats] = build_locales.build(["Tamil"], out, cache, batch_size=2, workers=1)
+    assert (stats["translated"], stats["rejected"], stats["missing"]) == (2, 1, 1)
+    table = json.loads((tmp_path / "locales" / "Tamil.json").read_text(encoding="utf-8"))
+    assert table == {"save": "Tamil:Save", "bye": "Tamil:Bye"}
+
+    sources["bye"] = "Goodbye"
+    sent.clear()
+    [stats] = build_locales.build(["Tamil"], out, cache, batch_size=2, workers=1)
+    assert sorted(k for batch in sent for k in batch) == ["bye", "greet"]
+    assert stats["cached"] == 1
+    table = json.loads((tmp_path / "locales" / "Tamil.json").read_text(encoding="utf-8"))
+    assert table["bye"] == "Tamil:Goodbye"
+
+
+def test_failed_batches_are_reported_and_left_out(tmp_path, monkeypatch):
+    def translate(batch, language):
+        raise RuntimeError("quota")
+
+    monkeypatch.setattr(build_locales, "source_strings", lambda: {"save": "Save"})
+    monkeypatch.setattr(build_locales.backend, "translate_ui_strings", translate)
+    [stats] = build_locales.build(["Tamil"], str(tmp_path), str(tmp_path / "c.sqlite3"), workers=1)
+    assert stats["errors"] == ["RuntimeError: quota"] and stats["missing"] == 1
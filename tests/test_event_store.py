@@ -0,0 +1,89 @@
+from datetime import date, timedelta
+
+import pytest
+
+from event_store import EventStore
+
+TODAY = date(2025, 9, 13)
+
+
+def _event(id, title, start, end, tags):
+    return {"id": id, "title": title, "start_date": start, "end_date": end,
+            "venue": "Hall", "city": "Jaipur", "description": "", "craft_tags": tags}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(str(tmp_path / "events.sqlite3"))
+    store.upsert_many([
+        _event("old", "Old Fair", date(2025, 8, 1), date(2025, 8, 3), ["Pottery"]),
+        _event("recent", "Recent Fair", date(2025, 9, 1), date(2025, 9, 2), ["Textiles"]),
+        _event("now", "Ongoing Fair", date(2025, 9, 12), date(2025, 9, 14), ["Pottery"]),
+        _event("soon", "Soon Fair", date(2025, 9, 20), date(2025, 9, 20), ["Weaving"]),
+        _event("later", "Later Fair", date(2025, 10, 5), date(2025, 10, 6), ["All"]),
+        _event("also-soon", "Another Soon Fair", date(2025, 9, 20), date(2025, 9, 21), ["Pottery"]),
+    ])
+    return store
+
+
+def ids(events):
+    return [ev["id"] for ev in events]
+
+
+def test_query_returns_events_overlapping_the_window(store):
+    assert ids(store.query(date(2025, 9, 1), date(2025, 9, 30))) == [
+        "recent", "now", "also-soon", "soon"]
+    assert ids(store.query(date(2025, 9, 14), date(2025, 9, 14))) == ["now"]
+    assert ids(store.query(end=date(2025, 8, 31))) == ["old"]
+    assert store.count(date(2025, 9, 1), date(2025, 9, 30)) == 4
+
+
+def test_craft_filter_is_case_insensitive_and_includes_all(store):
+    assert ids(store.query(crafts=["pottery"])) == ["old", "now", "also-soon", "later"]
+    assert store.count(crafts=["Weaving", "TEXTILES"]) == 3
+    assert store.tags() == ["All", "Pottery", "Textiles", "Weaving"]
+
+
+def test_today_orders_ongoing_upcoming_then_ended_oldest_first(store):
+    assert ids(store.query(today=TODAY)) == ["now", "also-soon", "soon", "later", "old", "recent"]
+
+
+def test_limit_and_offset_page_through_the_ordered_result(store):
+    first = store.query(today=TODAY, limit=4)
+    rest = store.query(today=TODAY, limit=4, offset=4)
+    assert ids(first) + ids(rest) == ids(store.query(today=TODAY))
+    assert len(rest) == 2
+
+
+def test_upsert_replaces_tags_and_bumps_version(store):
+    version = store.version
+    store.upsert_many([_event("soon", "Soon Fair", date(2025, 9, 20), date(2025, 9, 20), ["Metals"])])
+    assert store.version > version
+    assert "soon" not in ids(store.query(crafts=["Weaving"]))
+    assert ids(store.query(crafts=["metals"])) == ["soon", "later"]
+
+
+def test_get_many_and_delete(store):
+    assert ids(store.get_many(["later", "missing", "old"])) == ["old", "later"]
+    store.delete(["old"])
+    assert len(store) == 5 and store.get_many(["old"]) == []
+    assert "Pottery" in store.tags()
+
+
+def test_long_events_are_found_without_widening_the_window(store):
+    store.upsert_many([_event("season", "Craft Season", date(2025, 1, 1), date(2025, 12, 31), ["Metals"])])
+    assert store._max_span() == 2
+    assert ids(store.query(date(2025, 9, 14), date(2025, 9, 14))) == ["season", "now"]
+    assert ids(store.query(date(2025, 7, 1), date(2025, 7, 31), ["metals"])) == ["season"]
+    assert store.count(date(2025, 9, 14), date(2025, 9, 14)) == 2
+
+
+@pytest.mark.parametrize("crafts", [None, ["Pottery"]])
+def test_range_queries_are_bounded_on_the_start_date_index(store, crafts):
+    sql, params = store._matching(date(2025, 9, 1), date(2025, 9, 30), crafts)
+    plan = [row[3] for row in store._conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+    assert any("idx_events_start (start_date>? AND start_date<?)" in step for step in plan)
+    assert any("idx_events_long" in step for step in plan)
+    assert not any(step.startswith("SCAN events") for step in plan)
+    # The regular branch starts at the window start minus the longest regular span
+    assert params[0] == (date(2025, 9, 1) - timedelta(days=store._max_span())).isoformat()
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+import firebase_local
+from firebase_local import LocalFirebase, LocalFirebaseError
+
+
+def error_message(exc_info):
+    return json.loads(exc_info.value.args[1])["error"]["message"]
+
+
+@pytest.fixture
+def app():
+    return LocalFirebase(seed=1)
+
+
+def test_sign_up_sign_in_and_account_info(app):
+    auth = app.auth()
+    user = auth.create_user_with_email_and_password("Potter@example.com", "secret1")
+    again = auth.sign_in_with_email_and_password("potter@example.com", "secret1")
+    assert again["localId"] == user["localId"]
+    info = auth.get_account_info(again["idToken"])
+    assert info["users"][0]["email"] == "Potter@example.com"
+
+
+@pytest.mark.parametrize("email, password, message", [
+    ("not-an-email", "secret1", "INVALID_EMAIL"),
+    ("a@b.c", "123", "WEAK_PASSWORD : Password should be at least 6 characters"),
+])
+def test_sign_up_errors_look_like_pyrebase(app, email, password, message):
+    with pytest.raises(LocalFirebaseError) as exc:
+        app.auth().create_user_with_email_and_password(email, password)
+    assert error_message(exc) == message
+
+
+def test_duplicate_email_and_bad_password(app):
+    auth = app.auth()
+    auth.create_user_with_email_and_password("a@b.c", "secret1")
+    with pytest.raises(LocalFirebaseError) as exc:
+        auth.create_user_with_email_and_password("A@B.C", "secret2")
+    assert error_message(exc) == "EMAIL_EXISTS"
+    with pytest.raises(LocalFirebaseError) as exc:
+        auth.sign_in_with_email_and_password("a@b.c", "wrong!")
+    assert error_message(exc) == "INVALID_LOGIN_CREDENTIALS"
+
+
+def test_expired_tokens_are_rejected_and_refresh_issues_new_ones(monkeypatch, app):
+    auth = app.auth()
+    user = auth.create_user_with_email_and_password("a@b.c", "secret1")
+    now = firebase_local.time.time()
+    monkeypatch.setattr(firebase_local.time, "time", lambda: now + app.token_ttl_seconds + 1)
+    with pytest.raises(LocalFirebaseError) as exc:
+        auth.get_account_info(user["idToken"])
+    assert error_message(exc) == "TOKEN_EXPIRED"
+    refreshed = auth.refresh(user["refreshToken"])
+    assert refreshed["userId"] == user["localId"]
+    assert auth.get_account_info(refreshed["idToken"])["users"][0]["localId"] == user["localId"]
+    with pytest.raises(LocalFirebaseError):
+        auth.refresh("unknown")
+
+
+def test_database_set_update_get_remove(app):
+    db = app.database()
+    db.child("users").child("u1").set({"preferred_crafts": ["Pottery"], "reminders": []})
+    db.child("users/u1").update({"reminders": ["ev-1"]})
+    assert db.child("users", "u1").get().val() == {"preferred_crafts": ["Pottery"], "reminders": ["ev-1"]}
+    snapshot = db.child("users").child("u1").child("reminders").get()
+    assert snapshot.key() == "reminders" and snapshot.val() == ["ev-1"]
+    db.child("users").child("u1").remove()
+    assert db.child("users").child("u1").get().val() is None
+    assert db.child("missing").child("path").get().val() is None
+
+
+def test_require_auth_checks_tokens():
+    app = LocalFirebase(require_auth=True)
+    user = app.auth().create_user_with_email_and_password("a@b.c", "secret1")
+    with pytest.raises(LocalFirebaseError):
+        app.database().child("x").set(1)
+    app.database().child("x").set(1, token=user["idToken"])
+    with pytest.raises(LocalFirebaseError) as exc:
+        app.database().child("x").get(token="garbage")
+    assert error_message(exc) == "INVALID_ID_TOKEN"
+
+
+def test_failure_injection_is_counted():
+    app = LocalFirebase(failure_rate=1.0, seed=3)
+    with pytest.raises(LocalFirebaseError) as exc:
+        app.database().child("x").get()
+    assert error_message(exc) == "UNAVAILABLE"
+    assert app.stats["db.get"] == 1 and app.stats["db.get.failed"] == 1
+
+
+def test_from_settings_env_overrides_secrets(monkeypatch):
+    monkeypatch.setenv("FIREBASE_LOCAL_LATENCY_MS", "25")
+    monkeypatch.setenv("FIREBASE_LOCAL_REQUIRE_AUTH", "yes")
+    app = firebase_local.from_settings({"latency_ms": 5, "jitter_ms": 2, "unknown": 1})
+    assert (app.latency_ms, app.jitter_ms, app.require_auth) == (25.0, 2, True)
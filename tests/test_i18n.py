@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from i18n import Catalog
+
+BUILTIN = {
+    "English": {"title": "Artisan Hub", "save": "Save", "empty": "Empty"},
+    "Hindi": {"title": "कारीगर हब", "empty": ""},
+}
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    (tmp_path / "Tamil.json").write_text(json.dumps({"save": "சேமி"}), encoding="utf-8")
+    return Catalog(BUILTIN, required_keys=["only_key"], locales_dir=str(tmp_path))
+
+
+def test_missing_and_empty_strings_fall_back_to_english(catalog):
+    assert catalog.t("title", "Hindi") == "कारीगर हब"
+    assert catalog.t("save", "Hindi") == "Save"
+    assert catalog.t("empty", "Hindi") == "Empty"
+
+
+def test_keys_unknown_to_english_resolve_to_themselves(catalog):
+    assert catalog.t("only_key", "Hindi") == "only_key"
+    assert catalog.t("not_a_key", "English") == "not_a_key"
+
+
+def test_locale_files_are_listed_and_loaded_on_first_use(catalog):
+    assert catalog.languages() == ["English", "Hindi", "Tamil"]
+    assert "Tamil" not in catalog._tables
+    assert catalog.t("save", "Tamil") == "சேமி"
+    assert catalog.t("title", "Tamil") == "Artisan Hub"
+    assert catalog.table("Tamil") is catalog.table("Tamil")
+
+
+def test_unknown_languages_get_english_and_are_not_stored(catalog):
+    for lang in ("Klingon", "../Tamil", ""):
+        assert catalog.t("title", lang) == "Artisan Hub"
+        assert catalog.table(lang) is catalog.table("English")
+    assert sorted(catalog._tables) == ["English", "Hindi"]
+
+
+def test_tables_are_read_only(catalog):
+    with pytest.raises(TypeError):
+        catalog.table("English")["title"] = "changed"
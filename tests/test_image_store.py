@@ -0,0 +1,54 @@
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from image_store import ImageStore
+
+
+def image():
+    return Image.new("RGB", (800, 600), "teal")
+
+
+def age(store, key, seconds):
+    then = time.time() - seconds
+    os.utime(store.path(key), (then, then))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ImageStore(str(tmp_path / "images"), max_entries=3, ttl_seconds=3600)
+
+
+def test_put_writes_image_and_thumbnail(store):
+    key = store.put(ImageStore.key_for("imagen", "a  diya\nat dusk"), image())
+    assert key == ImageStore.key_for("imagen", "a diya at dusk") # whitespace-normalised
+    assert store.has(key) and len(store) == 1
+    assert max(Image.open(store.thumbnail_path(key)).size) == store.thumbnail_size
+    assert store.load(key).size == (800, 600)
+
+
+def test_put_evicts_least_recently_used_beyond_max_entries(store):
+    keys = [store.put(ImageStore.key_for("m", f"p{n}"), image()) for n in range(3)]
+    for n, key in enumerate(keys):
+        age(store, key, 300 - n * 100) # keys[0] is the oldest
+    assert store.has(keys[0]) # a hit refreshes keys[0], leaving keys[1] least recent
+    newest = store.put(ImageStore.key_for("m", "p3"), image())
+    assert [store.has(k) for k in (keys[0], keys[1], keys[2], newest)] == [True, False, True, True]
+    assert len(store) == 3
+    assert not os.path.exists(store.thumbnail_path(keys[1]))
+
+
+def test_put_drops_expired_images(store):
+    old = store.put(ImageStore.key_for("m", "old"), image())
+    age(store, old, 7200)
+    fresh = store.put(ImageStore.key_for("m", "fresh"), image())
+    assert not store.has(old) and store.has(fresh)
+    assert store.load(old) is None
+
+
+def test_put_keeps_the_key_just_written(tmp_path):
+    store = ImageStore(str(tmp_path / "images"), max_entries=0, ttl_seconds=0)
+    key = store.put(ImageStore.key_for("m", "only"), image())
+    assert store.has(key) and len(store) == 1
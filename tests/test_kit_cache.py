@@ -0,0 +1,62 @@
+import pytest
+
+import kit_cache
+from kit_cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(kit_cache.time, "time", clock)
+    return clock
+
+
+def test_roundtrip_and_delete(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "c.sqlite3"))
+    cache.set("k", {"story": "..."})
+    assert cache.get("k") == {"story": "..."}
+    cache.delete("k")
+    assert cache.get("k") is None and len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "c.sqlite3"), max_entries=2)
+    cache.set("a", 1)
+    clock.now += 1
+    cache.set("b", 2)
+    clock.now += 1
+    assert cache.get("a") == 1 # "a" is now more recently used than "b"
+    clock.now += 1
+    cache.set("c", 3)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "c.sqlite3"), ttl_seconds=60)
+    cache.set("a", 1)
+    clock.now += 30
+    cache.set("b", 2)
+    assert cache.get("a") == 1 # reading does not extend the TTL
+    clock.now += 31
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    clock.now += 60
+    cache.set("c", 3) # writes purge everything expired
+    assert len(cache) == 1
+
+
+def test_normalized_prompt_fields_share_a_key():
+    a = kit_cache.normalize_prompt_fields({"title": "Terracotta  Diya", "tone": "Warm", "extra": "x"})
+    b = kit_cache.normalize_prompt_fields({"title": "terracotta diya", "tone": "WARM"})
+    assert a == b
+    assert kit_cache.make_key("kit", a) == kit_cache.make_key("kit", b)
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+import backend
+
+KIT = {
+    "story": "Shaped by hand in Khurja.",
+    "instagram_post": {"caption": "Fresh from the kiln", "hashtags": "#pottery"},
+    "twitter_post": {"text": "New blue pottery drop"},
+    "facebook_post": {"caption": "Meet the makers", "hashtags": ""},
+}
+
+
+def test_complete_kit_is_parsed():
+    assert backend._parse_kit(json.dumps(KIT)) == KIT
+
+
+@pytest.mark.parametrize("reply", [
+    "not json",
+    "[]",
+    "{}",
+    json.dumps({**KIT, "story": "  "}),
+    json.dumps({k: v for k, v in KIT.items() if k != "twitter_post"}),
+    json.dumps({**KIT, "instagram_post": {}}),
+    json.dumps({**KIT, "facebook_post": {"caption": "", "hashtags": "#x"}}),
+    json.dumps({**KIT, "twitter_post": "New drop"}),
+])
+def test_incomplete_kits_are_rejected(reply):
+    assert backend._parse_kit(reply) is None
+
+
+class _Cache:
+    def __init__(self, value):
+        self.value, self.stored = value, []
+
+    def get(self, key):
+        return self.value
+
+    def set(self, key, value):
+        self.stored.append(value)
+
+
+class _Call:
+    def __init__(self):
+        self.failures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cache_hit(self):
+        pass
+
+    def cache_miss(self):
+        pass
+
+    def fail(self, error):
+        self.failures.append(error)
+
+
+def test_blank_reply_is_not_cached(monkeypatch):
+    cache, call = _Cache(None), _Call()
+    monkeypatch.setattr(backend, "get_response_cache", lambda: cache)
+    monkeypatch.setattr(backend, "_track", lambda *a, **k: call)
+    monkeypatch.setattr(backend, "_generate_text", lambda *a, **k: "{}")
+    monkeypatch.setattr(backend.st, "error", lambda *a, **k: None)
+    assert backend.get_ai_content({"title": "Vase"}, "English") is None
+    assert cache.stored == [] and call.failures == ["invalid_response"]
+
+
+def test_blank_cached_kit_counts_as_a_miss(monkeypatch):
+    cache = _Cache({"story": "", "instagram_post": {}, "twitter_post": {}, "facebook_post": {}})
+    monkeypatch.setattr(backend, "get_response_cache", lambda: cache)
+    monkeypatch.setattr(backend, "_track", lambda *a, **k: _Call())
+    monkeypatch.setattr(backend, "_generate_text", lambda *a, **k: json.dumps(KIT))
+    assert backend.get_ai_content({"title": "Vase"}, "English") == KIT
+    assert cache.stored == [KIT]
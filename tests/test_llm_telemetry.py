@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import pytest
+
+import llm_telemetry
+from llm_telemetry import CallRecord, TelemetryStore, classify_error
+
+
+class HttpError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TelemetryStore(str(tmp_path / "calls.sqlite3"))
+
+
+def response(prompt, output):
+    usage = SimpleNamespace(prompt_token_count=prompt, candidates_token_count=output,
+                            total_token_count=prompt + output)
+    return SimpleNamespace(usage_metadata=usage)
+
+
+def test_classify_error():
+    assert classify_error("invalid_response") == "invalid_response"
+    assert classify_error(TimeoutError()) == "timeout"
+    assert classify_error(HttpError(429)) == "rate_limited"
+    assert classify_error(HttpError(503)) == "transient"
+    assert classify_error(ValueError("1429 characters")) == "error"
+
+
+def test_summary_aggregates_calls_cache_and_tokens(store):
+    with CallRecord("kit", "Hindi", "m", store) as call:
+        call.cache_miss()
+        call.record_response(response(10, 30))
+    with CallRecord("kit", "Hindi", "m", store) as call:
+        call.cache_miss()
+        call.on_retry(2, HttpError(429))
+        call.record_response(response(20, 40))
+    with CallRecord("kit", "Hindi", "m", store) as call:
+        call.cache_hit()
+    with CallRecord("kit", "Hindi", "m", store) as call:
+        call.cache_miss() # shared a coalesced request: no upstream call of its own
+    [row] = store.summary()
+    assert (row["generator"], row["language"], row["calls"], row["upstream_calls"]) == ("kit", "Hindi", 4, 2)
+    assert row["cache_hit_rate"] == 0.25 and row["retries"] == 2
+    assert (row["prompt_tokens"], row["output_tokens"], row["total_tokens"]) == (30, 70, 100)
+    assert row["avg_total_tokens"] == 50.0 # only calls that reported usage
+    assert row["errors"] == {}
+
+
+def test_summary_groups_and_counts_errors(store):
+    with pytest.raises(TimeoutError):
+        with CallRecord("trends", "English", "m", store):
+            raise TimeoutError()
+    with CallRecord("trends", "English", "m", store) as call:
+        call.fail("invalid_response")
+    with CallRecord("image", None, "imagen", store) as call:
+        call.record_response(SimpleNamespace())
+    rows = {row["generator"]: row for row in store.summary()}
+    assert rows["trends"]["errors"] == {"timeout": 1, "invalid_response": 1}
+    assert rows["trends"]["cache_hit_rate"] is None
+    assert rows["image"]["avg_total_tokens"] is None and rows["image"]["upstream_calls"] == 1
+    assert [r["outcome"] for r in store.recent()] == ["ok", "error", "error"]
+    by_model = store.summary(group_by=("model",))
+    assert [(r["model"], r["calls"]) for r in by_model] == [("imagen", 1), ("m", 2)]
+
+
+def test_rolling_retention(tmp_path, monkeypatch):
+    store = TelemetryStore(str(tmp_path / "calls.sqlite3"), max_rows=3)
+    for n in range(5):
+        with CallRecord(f"g{n}", None, "m", store):
+            pass
+    assert [r["generator"] for r in store.recent()] == ["g4", "g3", "g2"]
+    now = llm_telemetry.time.time()
+    monkeypatch.setattr(llm_telemetry.time, "time", lambda: now + store.max_age_seconds + 1)
+    with CallRecord("late", None, "m", store):
+        pass
+    assert [r["generator"] for r in store.recent()] == ["late"]
+
+
+def test_summary_since_seconds(store, monkeypatch):
+    now = llm_telemetry.time.time()
+    monkeypatch.setattr(llm_telemetry.time, "time", lambda: now - 3600)
+    with CallRecord("kit", None, "m", store):
+        pass
+    monkeypatch.setattr(llm_telemetry.time, "time", lambda: now)
+    with CallRecord("kit", None, "m", store):
+        pass
+    assert store.summary()[0]["calls"] == 2
+    assert store.summary(since_seconds=60)[0]["calls"] == 1
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry(monkeypatch):
+    monkeypatch.setattr(metrics, "_registry", {})
+    monkeypatch.setattr(metrics, "_enabled", True)
+
+
+def series(name):
+    return metrics.snapshot()["metrics"].get(name, [])
+
+
+def test_timed_generator_is_timed_until_exhausted(monkeypatch):
+    clock = iter([1.0, 3.5]) # entry, exhaustion
+    monkeypatch.setattr(metrics.time, "perf_counter", lambda: next(clock))
+
+    @metrics.timed("stream_seconds", kind="kit")
+    def stream():
+        yield "a"
+        yield "b"
+        return "done"
+
+    gen = stream()
+    assert series("stream_seconds") == [] # nothing runs until iterated
+    assert next(gen) == "a" and next(gen) == "b"
+    assert series("stream_seconds") == []
+    with pytest.raises(StopIteration) as stop:
+        next(gen)
+    assert stop.value.value == "done"
+    [s] = series("stream_seconds")
+    assert s["labels"] == {"kind": "kit"} and s["count"] == 1 and s["sum"] == 2.5
+
+
+def test_timed_coroutine_is_timed_until_done():
+    @metrics.timed("async_seconds")
+    async def work():
+        await asyncio.sleep(0.02)
+        return 42
+
+    assert asyncio.run(work()) == 42
+    [s] = series("async_seconds")
+    assert s["count"] == 1 and s["sum"] >= 0.02
+
+
+def test_timed_records_failures_and_preserves_the_function():
+    @metrics.timed("failing_seconds")
+    def fail():
+        """Docstring."""
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        fail()
+    assert fail.__name__ == "fail" and fail.__doc__ == "Docstring."
+    assert series("failing_seconds")[0]["count"] == 1
+
+
+def test_disabled_timed_calls_through_without_recording(monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", False)
+
+    @metrics.timed("gen_seconds")
+    def gen():
+        yield 1
+        return 2
+
+    @metrics.timed("async_seconds")
+    async def work():
+        return 3
+
+    assert list(gen()) == [1]
+    assert asyncio.run(work()) == 3
+    assert metrics.snapshot()["metrics"] == {}
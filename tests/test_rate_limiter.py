@@ -0,0 +1,100 @@
+import pytest
+
+import rate_limiter
+from rate_limiter import TokenBucket
+
+
+def test_burst_is_free_then_callers_wait_one_interval_each():
+    bucket = TokenBucket(rpm=60, burst=2) # one token per second
+    waits = [bucket._reserve() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(1.0, abs=0.05)
+    assert waits[3] == pytest.approx(2.0, abs=0.05)
+
+
+def test_acquire_sleeps_for_the_reserved_wait(monkeypatch):
+    slept = []
+    monkeypatch.setattr(rate_limiter.time, "sleep", slept.append)
+    bucket = TokenBucket(rpm=600, burst=1) # one token per 0.1 s
+    assert bucket.acquire() == 0.0
+    wait = bucket.acquire()
+    assert wait == pytest.approx(0.1, abs=0.02)
+    assert slept == [wait]
+
+
+def test_configure_overrides_limits_by_model_name():
+    rate_limiter.configure({"models/test-model": {"rpm": 120, "burst": 3}})
+    bucket = rate_limiter.get_limiter("test-model")
+    assert bucket.rate == 2.0 and bucket.capacity == 3.0
+    assert rate_limiter.get_limiter("models/test-model") is bucket
+
+
+class HttpError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+
+
+def test_is_transient_uses_types_and_status_codes_not_message_text():
+    from google.api_core import exceptions as gexc
+    assert rate_limiter.is_transient(gexc.ResourceExhausted("quota"))
+    assert rate_limiter.is_transient(gexc.from_http_status(502, "bad gateway"))
+    assert rate_limiter.is_transient(HttpError(503))
+    assert rate_limiter.is_transient(TimeoutError())
+    assert not rate_limiter.is_transient(gexc.InvalidArgument("bad prompt"))
+    assert not rate_limiter.is_transient(HttpError(400))
+    assert not rate_limiter.is_transient(ValueError("prompt of 1500 characters: INTERNAL TIMEOUT"))
+
+
+def test_call_with_retry_retries_transient_errors_only(monkeypatch):
+    monkeypatch.setattr(rate_limiter.time, "sleep", lambda s: None)
+    attempts, retries = [], []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise HttpError(503)
+        return "ok"
+
+    result = rate_limiter.call_with_retry("retry-model", flaky, on_retry=lambda n, e: retries.append(n))
+    assert result == "ok" and retries == [1, 2]
+
+    def broken():
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    attempts.clear()
+    with pytest.raises(ValueError):
+        rate_limiter.call_with_retry("retry-model", broken)
+    assert len(attempts) == 1
+
+
+def test_deadline_bounds_retries_and_shortens_request_timeouts(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(rate_limiter.time, "sleep", lambda s: None)
+    monkeypatch.setattr(rate_limiter, "backoff_delay", lambda attempt: 1.0)
+    timeouts = []
+
+    def slow(request_options):
+        timeouts.append(request_options["timeout"])
+        clock[0] += request_options["timeout"] # the call runs into its timeout
+        raise TimeoutError()
+
+    rate_limiter.configure({"deadline-model": {"rpm": 1e9, "burst": 1e9}})
+    with pytest.raises(TimeoutError):
+        rate_limiter.call_with_retry("deadline-model", slow, request_options={"timeout": 600}, deadline=600)
+    assert timeouts == [600] # no second attempt at the full timeout
+
+    clock[0] = 0.0
+    timeouts.clear()
+
+    def quick_then_slow(request_options):
+        timeouts.append(request_options["timeout"])
+        clock[0] += 100 if len(timeouts) == 1 else request_options["timeout"]
+        raise HttpError(429)
+
+    with pytest.raises(HttpError):
+        rate_limiter.call_with_retry("deadline-model", quick_then_slow,
+                                     request_options={"timeout": 600}, deadline=600)
+    assert timeouts == [600, 500]
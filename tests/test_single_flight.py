@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight, make_key
+
+
+def test_make_key_normalizes_whitespace_and_case():
+    assert make_key("Terracotta  Diya", ["A  b"]) == make_key("terracotta diya", ["a B"])
+    assert make_key("diya") != make_key("lamp")
+
+
+def _run_concurrently(n, target):
+    results, errors = [], []
+
+    def run():
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(n)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join(timeout=5)
+    return results, errors
+
+
+def test_do_coalesces_concurrent_callers():
+    sf = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fn():
+        calls.append(1)
+        release.wait(timeout=5)
+        return "kit"
+
+    threading.Timer(0.2, release.set).start()
+    results, errors = _run_concurrently(5, lambda: sf.do("k", fn))
+    assert results == ["kit"] * 5 and not errors
+    assert len(calls) == 1
+
+
+def test_do_fans_out_the_leaders_error():
+    sf = SingleFlight()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError("quota")
+
+    results, errors = _run_concurrently(4, lambda: sf.do("k", fn))
+    assert not results and len(errors) == 4
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert len(calls) == 1
+
+
+def test_do_runs_again_once_the_call_finished():
+    sf = SingleFlight()
+    calls = []
+    sf.do("k", lambda: calls.append(1))
+    sf.do("k", lambda: calls.append(1))
+    assert len(calls) == 2
+
+
+def test_stream_shares_chunks_and_errors():
+    sf = SingleFlight()
+    calls = []
+
+    def gen():
+        calls.append(1)
+        yield "a"
+        time.sleep(0.1)
+        yield "b"
+        raise RuntimeError("cut off")
+
+    readers = [sf.stream("k", gen) for _ in range(3)]
+    for reader in readers:
+        chunks = []
+        with pytest.raises(RuntimeError):
+            for chunk in reader:
+                chunks.append(chunk)
+        assert chunks == ["a", "b"]
+    assert len(calls) == 1
+
+
+def test_do_async_coalesces_and_survives_a_cancelled_waiter():
+    sf = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return "trends"
+
+    async def main():
+        impatient = asyncio.create_task(sf.do_async("k", fetch))
+        patient = asyncio.create_task(sf.do_async("k", fetch))
+        await asyncio.sleep(0.05)
+        impatient.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return await patient
+
+    assert asyncio.run(main()) == "trends"
+    assert len(calls) == 1
+
+
+def test_do_async_cancels_upstream_when_no_waiters_remain():
+    sf = SingleFlight()
+    cancelled = []
+
+    async def fetch():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(sf.do_async("k", fetch), timeout=0.05)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    assert cancelled == [1]
@@ -0,0 +1,87 @@
+import base64
+import json
+import time
+
+import pytest
+
+import firebase_auth
+
+
+def jwt(exp, sub="u1"):
+    def part(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+    return f"{part({'alg': 'RS256'})}.{part({'exp': exp, 'sub': sub})}.sig"
+
+
+class Auth:
+    def __init__(self):
+        self.lookups = 0
+
+    def get_account_info(self, id_token):
+        self.lookups += 1
+        if id_token == "garbage":
+            raise ValueError("INVALID_ID_TOKEN")
+        return {"users": [{"localId": "u1", "email": "a@b.c"}]}
+
+    def refresh(self, refresh_token):
+        return {"userId": "u1", "idToken": jwt(time.time() + 3600), "refreshToken": "r2"}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    firebase_auth._verified_tokens.clear()
+    yield
+    firebase_auth._verified_tokens.clear()
+
+
+def test_token_expiry_reads_the_exp_claim():
+    assert firebase_auth.token_expiry(jwt(1234)) == 1234.0
+    assert firebase_auth.token_expiry("not.a-jwt") is None
+    assert firebase_auth.token_expiry(None) is None
+
+
+def test_token_expires_soon():
+    assert firebase_auth.token_expires_soon(jwt(time.time() + 60))
+    assert not firebase_auth.token_expires_soon(jwt(time.time() + 3600))
+    assert not firebase_auth.token_expires_soon(jwt(time.time() + 60), margin=0)
+    assert not firebase_auth.token_expires_soon("unreadable")
+
+
+def test_verified_tokens_skip_the_round_trip_until_they_expire():
+    auth, token = Auth(), jwt(time.time() + 3600)
+    user, err = firebase_auth.verify_token_cached(auth, token)
+    assert err is None and user["email"] == "a@b.c"
+    assert firebase_auth.verify_token_cached(auth, token)[0]["localId"] == "u1"
+    assert auth.lookups == 1
+
+
+def test_expired_tokens_fail_without_a_round_trip():
+    auth = Auth()
+    assert firebase_auth.verify_token_cached(auth, jwt(time.time() - 5)) == (None, "TOKEN_EXPIRED")
+    assert auth.lookups == 0
+
+
+def test_unreadable_tokens_are_always_verified_remotely():
+    auth = Auth()
+    for _ in range(2):
+        assert firebase_auth.verify_token_cached(auth, "garbage")[0] is None
+    assert auth.lookups == 2
+
+
+def test_refreshed_tokens_are_trusted_without_a_lookup():
+    auth = Auth()
+    user, err = firebase_auth.refresh_token(auth, "r1")
+    assert err is None
+    cached, _ = firebase_auth.verify_token_cached(auth, user["idToken"])
+    assert cached["localId"] == "u1" and auth.lookups == 0
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(firebase_auth, "_MAX_VERIFIED_TOKENS", 3)
+    auth = Auth()
+    tokens = [jwt(time.time() + 3600, sub=f"u{i}") for i in range(4)]
+    for token in tokens:
+        firebase_auth.verify_token_cached(auth, token)
+    assert len(firebase_auth._verified_tokens) == 3
+    firebase_auth.verify_token_cached(auth, tokens[0]) # the oldest was evicted
+    assert auth.lookups == 5
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+import firebase_auth
+from firebase_local import LocalFirebase
+
+
+class CountingDb:
+    """LocalFirebase database that also records every write."""
+
+    def __init__(self, fail=False):
+        self.app = LocalFirebase(failure_rate=1.0 if fail else 0.0)
+        self.db = self.app.database()
+
+    def child(self, *parts):
+        return self.db.child(*parts)
+
+    @property
+    def writes(self):
+        return self.app.stats["db.set"]
+
+
+@pytest.fixture(autouse=True)
+def fast_debounce(monkeypatch):
+    monkeypatch.setattr(firebase_auth, "SAVE_DEBOUNCE_SECONDS", 0.2)
+    monkeypatch.setattr(firebase_auth, "SAVE_MAX_DELAY_SECONDS", 0.5)
+    yield
+    firebase_auth.flush_user_data()
+    firebase_auth._save_errors.clear()
+
+
+def stored(db, uid):
+    return db.child("users").child(uid).get().val()
+
+
+def test_rapid_saves_coalesce_into_one_write_of_the_latest_record():
+    db = CountingDb()
+    for n in range(5):
+        firebase_auth.queue_user_data(db, "u1", {"reminders": [f"ev-{n}"]})
+    assert db.writes == 0 # nothing blocks the rerun
+    time.sleep(0.4)
+    assert db.writes == 1
+    assert stored(db, "u1") == {"reminders": ["ev-4"]}
+
+
+def test_continuous_saves_are_written_by_the_max_delay():
+    db = CountingDb()
+    deadline = time.monotonic() + 0.8
+    while time.monotonic() < deadline and db.writes == 0:
+        firebase_auth.queue_user_data(db, "u1", {"n": time.monotonic()})
+        time.sleep(0.05)
+    assert db.writes >= 1
+
+
+def test_load_user_data_reads_its_own_pending_write():
+    db = CountingDb()
+    firebase_auth.queue_user_data(db, "u1", {"preferred_crafts": ["Pottery"]})
+    assert firebase_auth.load_user_data(db, "u1") == {"preferred_crafts": ["Pottery"]}
+    assert db.writes == 1
+
+
+def test_flush_reports_failures_through_take_save_error():
+    db = CountingDb(fail=True)
+    firebase_auth.queue_user_data(db, "u1", {"reminders": []})
+    assert firebase_auth.flush_user_data("u1") is False
+    assert "UNAVAILABLE" in firebase_auth.take_save_error("u1")
+    assert firebase_auth.take_save_error("u1") is None
+    assert firebase_auth.flush_user_data("u1") is True # nothing pending any more